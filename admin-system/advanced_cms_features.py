@@ -17,6 +17,7 @@ import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import smtplib
+from compressed_text import CompressedText
 
 # Additional Models for Advanced Features
 class ArticleRevision(db.Model):
@@ -24,7 +25,7 @@ class ArticleRevision(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('article.id'), nullable=False)
     title = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.deferred(db.Column(CompressedText, nullable=False))  # Compressed; loaded on access
     excerpt = db.Column(db.Text)
     revision_number = db.Column(db.Integer, default=1)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
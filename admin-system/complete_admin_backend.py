@@ -17,6 +17,7 @@ from functools import wraps
 import schedule
 import threading
 import time
+from sqlalchemy import event, inspect
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
@@ -47,6 +48,7 @@ class User(db.Model):
     bio = db.Column(db.Text)
     avatar_url = db.Column(db.String(255))
     is_active = db.Column(db.Boolean, default=True)
+    article_count = db.Column(db.Integer, default=0, nullable=False)  # Published articles
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
 
@@ -59,6 +61,7 @@ class Category(db.Model):
     description = db.Column(db.Text)
     color = db.Column(db.String(7), default='#dc2626')
     is_active = db.Column(db.Boolean, default=True)
+    article_count = db.Column(db.Integer, default=0, nullable=False)  # Published articles
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Article(db.Model):
@@ -131,6 +134,104 @@ class MediaItem(db.Model):
     uploader = db.relationship('User')
     article = db.relationship('Article')
 
+# Published-article counters
+# Adjusted inside the flush that changes an article so they commit or roll
+# back together with it. reconcile_article_counts() repairs any drift.
+def _adjust_article_counts(connection, category_id, author_id, delta):
+    """Apply a published-article delta to a category and an author"""
+    if category_id is not None:
+        categories = Category.__table__
+        connection.execute(
+            categories.update()
+            .where(categories.c.id == category_id)
+            .values(article_count=categories.c.article_count + delta)
+        )
+    if author_id is not None:
+        users = User.__table__
+        connection.execute(
+            users.update()
+            .where(users.c.id == author_id)
+            .values(article_count=users.c.article_count + delta)
+        )
+
+def _previous_value(target, attr):
+    """Value of an attribute before the pending flush"""
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+@event.listens_for(Article.status, 'set', active_history=True)
+@event.listens_for(Article.category_id, 'set', active_history=True)
+@event.listens_for(Article.author_id, 'set', active_history=True)
+def _track_counted_attribute(target, value, oldvalue, initiator):
+    """Load the old value on assignment so counter deltas can see it"""
+    return value
+
+@event.listens_for(Article, 'after_insert')
+def _article_inserted(mapper, connection, target):
+    if target.status == 'published':
+        _adjust_article_counts(connection, target.category_id, target.author_id, 1)
+
+@event.listens_for(Article, 'after_update')
+def _article_updated(mapper, connection, target):
+    # Most updates (view counts, edits) touch none of the counted attributes
+    state = inspect(target)
+    if not any(state.attrs[attr].history.has_changes() for attr in ('status', 'category_id', 'author_id')):
+        return
+    
+    was_published = _previous_value(target, 'status') == 'published'
+    is_published = target.status == 'published'
+    old_category_id = _previous_value(target, 'category_id')
+    old_author_id = _previous_value(target, 'author_id')
+    
+    if was_published:
+        if (is_published and old_category_id == target.category_id
+                and old_author_id == target.author_id):
+            return
+        _adjust_article_counts(connection, old_category_id, old_author_id, -1)
+    if is_published:
+        _adjust_article_counts(connection, target.category_id, target.author_id, 1)
+
+@event.listens_for(Article, 'before_delete')
+def _article_deleted(mapper, connection, target):
+    if target.status == 'published':
+        _adjust_article_counts(connection, target.category_id, target.author_id, -1)
+
+def reconcile_article_counts():
+    """Recompute published-article counters and repair any drift"""
+    repaired = {}
+    
+    for model, group_column in ((Category, Article.category_id), (User, Article.author_id)):
+        expected = dict(
+            db.session.query(group_column, db.func.count(Article.id))
+            .filter(Article.status == 'published')
+            .group_by(group_column)
+            .all()
+        )
+        
+        drifted = [
+            (row_id, expected.get(row_id, 0))
+            for row_id, current in db.session.query(model.id, model.article_count)
+            if current != expected.get(row_id, 0)
+        ]
+        for row_id, count in drifted:
+            db.session.query(model).filter(model.id == row_id).update(
+                {model.article_count: count}, synchronize_session=False
+            )
+        
+        repaired[model.__tablename__] = len(drifted)
+    
+    db.session.commit()
+    return repaired
+
+@app.cli.command('reconcile-counts')
+def reconcile_counts_command():
+    """Repair category and author published-article counters"""
+    repaired = reconcile_article_counts()
+    for table, count in repaired.items():
+        print(f"✅ {table}: {count} counter(s) repaired")
+
 # Authentication decorator
 def admin_required(f):
     @wraps(f)
@@ -254,7 +355,7 @@ def get_users():
                     'is_active': user.is_active,
                     'created_at': user.created_at.isoformat(),
                     'last_login': user.last_login.isoformat() if user.last_login else None,
-                    'article_count': len(user.articles)
+                    'article_count': user.article_count
                 } for user in users.items],
                 'pagination': {
                     'page': users.page,
@@ -423,7 +524,7 @@ def get_categories():
                 'description': cat.description,
                 'color': cat.color,
                 'is_active': cat.is_active,
-                'article_count': len(cat.articles)
+                'article_count': cat.article_count
             } for cat in categories]
         })
     except Exception as e:
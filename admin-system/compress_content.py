@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Article Body Compression Tool
+For GlobalPerspective News Platform
+
+    python compress_content.py migrate [--batch-size 500] [--recompress]
+    python compress_content.py train --output content.zdict --id 2 [--sample 2000]
+    python compress_content.py benchmark [--sample 500]
+    python compress_content.py restore-articles [--batch-size 500]
+
+migrate rewrites legacy plain-text revision bodies in the compressed
+format, one id-ordered batch per transaction, so it can be stopped and
+resumed at any time. Run database-setup/neon_database_setup.py first so
+article_revisions.content is BYTEA. Live article bodies are not
+compressed; train and benchmark only read them as samples.
+
+restore-articles is for databases whose articles.content was converted
+to compressed BYTEA: it writes every body back as plain UTF-8 so the
+setup script can return the column to TEXT.
+"""
+
+import argparse
+import time
+from sqlalchemy import table, column, select, bindparam, Integer, LargeBinary
+from complete_admin_backend import app, db
+import compressed_text
+
+# Compressed body columns: table -> column
+TARGETS = {
+    'article_revisions': 'content'
+}
+
+def _content_table(table_name):
+    return table(table_name, column('id', Integer), column('content', LargeBinary))
+
+def _raw_bytes(value):
+    # SQLite hands back legacy TEXT values as str
+    return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+def iter_batches(connection, table_name, batch_size):
+    """Yield (id, stored bytes) batches in id order"""
+    t = _content_table(table_name)
+    body = t.c.content
+    last_id = 0
+    
+    while True:
+        rows = connection.execute(
+            select(t.c.id, body).where(t.c.id > last_id).order_by(t.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield [(row_id, _raw_bytes(value)) for row_id, value in rows if value is not None]
+        last_id = rows[-1][0]
+
+def migrate(batch_size=500, recompress=False):
+    """Compress every body still stored as plain text"""
+    target_dictionary = compressed_text.active_dictionary_id()
+    
+    for table_name in TARGETS:
+        t = _content_table(table_name)
+        body = t.c[TARGETS[table_name]]
+        statement = t.update().where(t.c.id == bindparam('row_id')).values({body.name: bindparam('body')})
+        
+        scanned = rewritten = bytes_before = bytes_after = 0
+        with db.engine.connect() as reader:
+            for batch in iter_batches(reader, table_name, batch_size):
+                updates = []
+                for row_id, stored in batch:
+                    scanned += 1
+                    if compressed_text.is_compressed(stored):
+                        if not recompress or stored[len(compressed_text.MAGIC)] == target_dictionary:
+                            continue
+                    text = compressed_text.decompress_text(stored)
+                    packed = compressed_text.compress_text(text, target_dictionary)
+                    if packed == stored:
+                        continue
+                    updates.append({'row_id': row_id, 'body': packed})
+                    bytes_before += len(stored)
+                    bytes_after += len(packed)
+                
+                if updates:
+                    with db.engine.begin() as writer:
+                        writer.execute(statement, updates)
+                    rewritten += len(updates)
+                
+                print(f"   {table_name}: {scanned} scanned, {rewritten} compressed")
+        
+        saved = bytes_before - bytes_after
+        print(f"✅ {table_name}: {rewritten}/{scanned} rows compressed, {saved / 1024:.1f} KB saved")
+
+def restore_articles(batch_size=500):
+    """Write compressed article bodies back as plain UTF-8"""
+    articles = _content_table('articles')
+    statement = articles.update().where(articles.c.id == bindparam('row_id')).values(content=bindparam('body'))
+    
+    scanned = restored = 0
+    with db.engine.connect() as reader:
+        for batch in iter_batches(reader, 'articles', batch_size):
+            updates = [
+                {'row_id': row_id, 'body': compressed_text.decompress_text(stored).encode('utf-8')}
+                for row_id, stored in batch if compressed_text.is_compressed(stored)
+            ]
+            scanned += len(batch)
+            if updates:
+                with db.engine.begin() as writer:
+                    writer.execute(statement, updates)
+                restored += len(updates)
+            print(f"   articles: {scanned} scanned, {restored} restored")
+    
+    print(f"✅ articles: {restored}/{scanned} bodies restored; rerun neon_database_setup.py to make the column TEXT")
+
+def sample_bodies(limit):
+    """Most recent article bodies, as text"""
+    articles = _content_table('articles')
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            select(articles.c.content).order_by(articles.c.id.desc()).limit(limit)
+        ).scalars().all()
+    return [compressed_text.decompress_text(_raw_bytes(value)) for value in rows if value is not None]
+
+def train(output, dictionary_id, sample=2000):
+    """Train a preset dictionary from recent articles and save it"""
+    bodies = sample_bodies(sample)
+    if not bodies:
+        print("❌ No articles to train on")
+        return
+    
+    dictionary = compressed_text.train_dictionary(bodies)
+    compressed_text.save_dictionary_file(output, dictionary_id, dictionary)
+    print(f"✅ Trained {len(dictionary)} byte dictionary (id {dictionary_id}) from {len(bodies)} articles")
+    print(f"   Set CONTENT_DICTIONARY_PATH={output} to use it for new writes")
+
+def benchmark(sample=500, rounds=5):
+    """Report size and read latency for each available dictionary"""
+    bodies = sample_bodies(sample)
+    if not bodies:
+        print("❌ No articles to benchmark")
+        return
+    
+    raw = [body.encode('utf-8') for body in bodies]
+    raw_size = sum(len(value) for value in raw)
+    
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for value in raw:
+            value.decode('utf-8')
+    raw_read = (time.perf_counter() - start) / (rounds * len(raw))
+    
+    print(f"📊 {len(bodies)} articles, {raw_size / 1024:.1f} KB as plain text")
+    print(f"   {'dictionary':<12}{'size KB':>10}{'ratio':>8}{'write µs':>11}{'read µs':>10}")
+    print(f"   {'none (raw)':<12}{raw_size / 1024:>10.1f}{1.0:>8.2f}{0.0:>11.1f}{raw_read * 1e6:>10.1f}")
+    
+    labels = {0: 'zlib', 1: 'builtin'}
+    for dictionary_id in sorted(compressed_text._dictionaries):
+        start = time.perf_counter()
+        packed = [compressed_text.compress_text(body, dictionary_id) for body in bodies]
+        write = (time.perf_counter() - start) / len(bodies)
+        
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for value in packed:
+                compressed_text.decompress_text(value)
+        read = (time.perf_counter() - start) / (rounds * len(packed))
+        
+        size = sum(len(value) for value in packed)
+        label = labels.get(dictionary_id, f'trained #{dictionary_id}')
+        print(f"   {label:<12}{size / 1024:>10.1f}{raw_size / max(size, 1):>8.2f}{write * 1e6:>11.1f}{read * 1e6:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress article revision bodies")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    migrate_parser = commands.add_parser('migrate', help="Compress existing rows in batches")
+    migrate_parser.add_argument('--batch-size', type=int, default=500)
+    migrate_parser.add_argument('--recompress', action='store_true',
+                                help="Also rewrite rows compressed with another dictionary")
+    
+    train_parser = commands.add_parser('train', help="Train a dictionary from recent articles")
+    train_parser.add_argument('--output', required=True)
+    train_parser.add_argument('--id', type=int, required=True, help="Dictionary id, 2-255, never reused")
+    train_parser.add_argument('--sample', type=int, default=2000)
+    
+    benchmark_parser = commands.add_parser('benchmark', help="Compare size and read latency")
+    benchmark_parser.add_argument('--sample', type=int, default=500)
+    
+    restore_parser = commands.add_parser('restore-articles', help="Decompress article bodies stored as BYTEA")
+    restore_parser.add_argument('--batch-size', type=int, default=500)
+    
+    args = parser.parse_args()
+    with app.app_context():
+        if args.command == 'migrate':
+            migrate(args.batch_size, args.recompress)
+        elif args.command == 'train':
+            train(args.output, args.id, args.sample)
+        elif args.command == 'benchmark':
+            benchmark(args.sample)
+        elif args.command == 'restore-articles':
+            restore_articles(args.batch_size)
+
+if __name__ == '__main__':
+    main()
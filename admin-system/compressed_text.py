@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Compressed Text Column Type
+For GlobalPerspective News Platform
+
+Article revision bodies are stored as zlib streams primed with a preset
+dictionary of common HTML, which compresses short news bodies far better
+than plain zlib. Live article bodies stay plain TEXT: the public backends
+search them with ILIKE and serve them as-is. Stored values look like:
+
+    MAGIC + dictionary id (1 byte) + zlib stream
+
+Anything without the magic prefix is legacy UTF-8 text written before
+compression was enabled, so existing rows stay readable while
+compress_content.py migrates them in batches.
+"""
+
+import os
+import re
+import zlib
+from collections import Counter
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+MAGIC = b'\x1fGP'
+
+# Compression settings
+COMPRESSION_LEVEL = int(os.getenv('CONTENT_COMPRESSION_LEVEL', '6'))
+MIN_COMPRESS_BYTES = 128  # Shorter values are stored as plain UTF-8
+MAX_DICTIONARY_BYTES = 32 * 1024  # zlib only looks back 32KB
+
+# Built-in dictionary: markup and phrases that recur in our article HTML.
+# zlib favours matches near the end of the dictionary, so the most common
+# snippets come last. Never edit this in place: rows written with id 1
+# depend on it byte for byte. Train a new dictionary with a new id instead.
+BUILTIN_DICTIONARY = ''.join([
+    '<figure class="image"><img src="https://" alt="" loading="lazy"><figcaption></figcaption></figure>',
+    '<table><thead><tr><th></th></tr></thead><tbody><tr><td></td></tr></tbody></table>',
+    '<iframe src="https://www.youtube.com/embed/" frameborder="0" allowfullscreen></iframe>',
+    '<blockquote class="twitter-tweet"><p lang="en" dir="ltr"></p></blockquote>',
+    '<h2></h2><h3></h3><h4></h4><ol><li></li></ol><ul><li></li></ul>',
+    '<blockquote><p></p></blockquote><em></em><br>',
+    'according to the government international minister president economic political ',
+    'security foreign policy European Union United States United Nations China Russia ',
+    'said in a statement on the reported that officials in the country ',
+    '<a href="https://" target="_blank" rel="noopener noreferrer"></a>',
+    '<strong></strong><p><strong></strong></p>',
+    ' of the  and the  in the  to the  that the  for the ',
+    '</p>\n<p>'
+]).encode('utf-8')
+
+# Dictionary registry: id -> bytes. Id 0 means no dictionary.
+_dictionaries = {0: b'', 1: BUILTIN_DICTIONARY}
+_active_dictionary_id = 1
+
+def register_dictionary(dictionary_id, dictionary, activate=True):
+    """Register a trained dictionary, optionally making it the one used for writes"""
+    global _active_dictionary_id
+    
+    if not 2 <= dictionary_id <= 255:
+        raise ValueError("Trained dictionary ids must be between 2 and 255")
+    
+    existing = _dictionaries.get(dictionary_id)
+    if existing is not None and existing != dictionary:
+        raise ValueError(f"Dictionary id {dictionary_id} is already registered with different contents")
+    
+    _dictionaries[dictionary_id] = dictionary[-MAX_DICTIONARY_BYTES:]
+    if activate:
+        _active_dictionary_id = dictionary_id
+
+def load_dictionary_file(path, activate=True):
+    """Load a dictionary written by save_dictionary_file()"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    register_dictionary(data[0], data[1:], activate=activate)
+    return data[0]
+
+def save_dictionary_file(path, dictionary_id, dictionary):
+    """Write a trained dictionary prefixed with its id"""
+    with open(path, 'wb') as f:
+        f.write(bytes([dictionary_id]) + dictionary)
+
+def active_dictionary_id():
+    return _active_dictionary_id
+
+def compress_text(text, dictionary_id=None):
+    """Compress text into the stored format"""
+    raw = text.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return raw
+    
+    if dictionary_id is None:
+        dictionary_id = _active_dictionary_id
+    dictionary = _dictionaries[dictionary_id]
+    
+    if dictionary:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    compressed = compressor.compress(raw) + compressor.flush()
+    
+    # Incompressible bodies are cheaper to keep as plain text
+    if len(compressed) + len(MAGIC) + 1 >= len(raw):
+        return raw
+    
+    return MAGIC + bytes([dictionary_id]) + compressed
+
+def decompress_text(data):
+    """Decode a stored value, compressed or legacy plain text"""
+    if isinstance(data, str):
+        return data
+    
+    data = bytes(data)
+    if not data.startswith(MAGIC):
+        return data.decode('utf-8')
+    
+    dictionary_id = data[len(MAGIC)]
+    dictionary = _dictionaries.get(dictionary_id)
+    if dictionary is None:
+        raise ValueError(f"Unknown content dictionary id {dictionary_id}; load its dictionary file first")
+    
+    if dictionary:
+        decompressor = zlib.decompressobj(zdict=dictionary)
+    else:
+        decompressor = zlib.decompressobj()
+    return (decompressor.decompress(data[len(MAGIC) + 1:]) + decompressor.flush()).decode('utf-8')
+
+def is_compressed(data):
+    return data is not None and not isinstance(data, str) and bytes(data[:len(MAGIC)]) == MAGIC
+
+def train_dictionary(samples, size=MAX_DICTIONARY_BYTES):
+    """Build a zlib preset dictionary from sample bodies
+    
+    Scores recurring tags and word runs by how many bytes they would save
+    (frequency x length) and packs the best ones, most valuable last.
+    """
+    token_pattern = re.compile(r'<[^<>]{1,120}>|(?:[A-Za-z]+[ ,.]){2,4}')
+    counts = Counter()
+    for sample in samples:
+        counts.update(token_pattern.findall(sample))
+    
+    scored = sorted(
+        ((count * len(token), token) for token, count in counts.items() if count > 1),
+        reverse=True
+    )
+    
+    chosen = []
+    used = 0
+    for _, token in scored:
+        encoded = token.encode('utf-8')
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    
+    chosen.reverse()
+    return b''.join(chosen)
+
+class CompressedText(TypeDecorator):
+    """Text column stored compressed; reads decompress transparently
+    
+    Declare it with db.deferred() so listing queries never fetch or
+    decompress the body unless it is accessed.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
+
+# A trained dictionary can be supplied per deployment
+if os.getenv('CONTENT_DICTIONARY_PATH'):
+    load_dictionary_file(os.getenv('CONTENT_DICTIONARY_PATH'))
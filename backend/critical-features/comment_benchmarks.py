@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Comment Pipeline Benchmarks
+For GlobalPerspective News Platform
+
+    python comment_benchmarks.py spam [--rounds 200] [--keywords 13 500 2000]
+    python comment_benchmarks.py sanitize [--rounds 5] [--comments 5000]
+
+spam times CommentValidator.detect_spam against the previous implementation
+(one substring search per keyword, a link regex, a caps generator and a
+backreference regex) on short and long comments, for growing keyword lists.
+
+sanitize times CommentValidator.sanitize_content against a full bleach.clean
+of every comment, over a mix of plain prose, ampersands, light markup and a
+spam wave of repeated bodies.
+"""
+
+import argparse
+import bleach
+import random
+import re
+import string
+import time
+from comment_system import CommentValidator
+
+LEGACY_LINK_PATTERN = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+
+def legacy_detect_spam(content, keywords):
+    """detect_spam's heuristics as they were before the single-pass scan"""
+    spam_score = 0
+    content_lower = content.lower()
+    
+    for keyword in keywords:
+        if keyword in content_lower:
+            spam_score += 2
+    
+    link_count = len(re.findall(LEGACY_LINK_PATTERN, content))
+    if link_count > 2:
+        spam_score += link_count
+    
+    caps_ratio = sum(1 for c in content if c.isupper()) / max(len(content), 1)
+    if caps_ratio > 0.3:
+        spam_score += 3
+    
+    if re.search(r'(.)\1{4,}', content):
+        spam_score += 2
+    
+    return spam_score
+
+def sample_comments(count, length, seed=7):
+    """Plausible comment text: words, punctuation, the odd link and keyword"""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+                  for _ in range(2000)]
+    vocabulary += ['the', 'and', 'government', 'policy', 'Minister', 'EU', 'https://example.com/a?b=1', 'winner']
+    
+    comments = []
+    for _ in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(rng.choice(vocabulary))
+        comments.append(' '.join(words)[:length])
+    return comments
+
+def generated_keywords(count, seed=11):
+    rng = random.Random(seed)
+    keywords = list(CommentValidator.SPAM_KEYWORDS)
+    while len(keywords) < count:
+        keywords.append(' '.join(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+                                 for _ in range(rng.randint(1, 2))))
+    return keywords[:count]
+
+def time_per_call(function, comments, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for comment in comments:
+            function(comment)
+    return (time.perf_counter() - start) / (rounds * len(comments))
+
+def benchmark_spam(rounds=200, keyword_counts=(13, 500, 2000)):
+    """Per-comment detect_spam cost, legacy vs single pass"""
+    print(f"📊 detect_spam, µs per comment ({rounds} rounds)")
+    print(f"   {'keywords':>9}{'length':>8}{'legacy':>10}{'single pass':>13}{'speedup':>9}")
+    
+    for keyword_count in keyword_counts:
+        keywords = generated_keywords(keyword_count)
+        CommentValidator.set_spam_keywords(keywords)
+        
+        for length in (200, 5000):
+            comments = sample_comments(20, length)
+            legacy = time_per_call(lambda comment: legacy_detect_spam(comment, keywords), comments, rounds)
+            current = time_per_call(CommentValidator.detect_spam, comments, rounds)
+            print(f"   {keyword_count:>9}{length:>8}{legacy * 1e6:>10.1f}{current * 1e6:>13.1f}{legacy / current:>8.2f}x")
+    
+    CommentValidator.set_spam_keywords(CommentValidator.SPAM_KEYWORDS)
+
+def legacy_sanitize(content):
+    """sanitize_content as it was before the plain-text fast path and memo"""
+    clean_content = bleach.clean(
+        content,
+        tags=CommentValidator.ALLOWED_TAGS,
+        attributes=CommentValidator.ALLOWED_ATTRIBUTES,
+        strip=True
+    )
+    return re.sub(r'\s+', ' ', clean_content).strip()
+
+def sanitize_corpus(count, seed=5):
+    """70% plain prose, 10% with ampersands, 10% light markup, 10% a spam wave"""
+    rng = random.Random(seed)
+    prose = sample_comments(200, 1200, seed)
+    wave = [f'<p>Earn {amount} a week from home! <a href="https://spam.example/{amount}">Start now</a></p>'
+            for amount in range(20)]
+    
+    corpus = []
+    for _ in range(count):
+        text = rng.choice(prose)[:rng.randint(40, 1200)]
+        kind = rng.random()
+        if kind < 0.7:
+            corpus.append(text)
+        elif kind < 0.8:
+            corpus.append(text.replace(' and ', ' & ', 1) + ' Q&A later > now')
+        elif kind < 0.9:
+            corpus.append(f'<p>{text}</p><p><strong>Agreed.</strong> <a href="https://example.com">source</a></p>')
+        else:
+            corpus.append(rng.choice(wave))
+    return corpus
+
+def benchmark_sanitize(rounds=5, count=5000):
+    """CPU per comment for sanitization, full parse vs fast path and memo"""
+    corpus = sanitize_corpus(count)
+    mismatches = sum(1 for comment in corpus if legacy_sanitize(comment) != CommentValidator.sanitize_content(comment))
+    
+    start = time.process_time()
+    for _ in range(rounds):
+        for comment in corpus:
+            legacy_sanitize(comment)
+    legacy = (time.process_time() - start) / (rounds * count)
+    
+    for key in CommentValidator.sanitize_stats:
+        CommentValidator.sanitize_stats[key] = 0
+    start = time.process_time()
+    for _ in range(rounds):
+        CommentValidator._sanitize_memo.clear()  # Only duplicates within the corpus may hit
+        for comment in corpus:
+            CommentValidator.sanitize_content(comment)
+    current = (time.process_time() - start) / (rounds * count)
+    
+    paths = CommentValidator.sanitize_stats
+    total = sum(paths.values())
+    print(f"📊 sanitize_content over {count} comments ({rounds} rounds), CPU µs per comment")
+    print(f"   {'full parse':<14}{legacy * 1e6:>10.1f}")
+    print(f"   {'fast path':<14}{current * 1e6:>10.1f}   {legacy / current:.2f}x")
+    print(f"   plain {paths['plain'] / total:.0%}, memo hits {paths['memo_hits'] / total:.0%}, "
+          f"parsed {paths['parsed'] / total:.0%}")
+    print(f"   CPU saved per 10k comments: {(legacy - current) * 10000:.2f}s")
+    print(f"   Output mismatches: {mismatches}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the comment pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    spam_parser = commands.add_parser('spam', help="detect_spam cost by keyword list size")
+    spam_parser.add_argument('--rounds', type=int, default=200)
+    spam_parser.add_argument('--keywords', type=int, nargs='+', default=[13, 500, 2000])
+    
+    sanitize_parser = commands.add_parser('sanitize', help="sanitize_content cost on a mixed corpus")
+    sanitize_parser.add_argument('--rounds', type=int, default=5)
+    sanitize_parser.add_argument('--comments', type=int, default=5000)
+    
+    args = parser.parse_args()
+    if args.command == 'spam':
+        benchmark_spam(args.rounds, args.keywords)
+    elif args.command == 'sanitize':
+        benchmark_sanitize(args.rounds, args.comments)
+
+if __name__ == '__main__':
+    main()
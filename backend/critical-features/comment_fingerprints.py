@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Comment Detection
+For GlobalPerspective News Platform
+
+Spam waves post one text with small edits across many articles. Each
+comment gets a 64-bit SimHash of its words; an edit flips only a few bits,
+so copies sit within a small Hamming distance of each other while unrelated
+comments are typically 20 or more bits apart.
+
+Recent fingerprints live in a fixed-size file mapped into every worker on
+the host (/dev/shm when available):
+
+    header | ring of SLOT_COUNT records | 4 band tables of 2^16 buckets
+
+A record is (fingerprint, time, article id, IP hash). The LSH index splits
+each fingerprint into four 16-bit bands, and each band value addresses a
+bucket holding the last BUCKET_SIZE slots with that band. Fingerprints
+within distance 3 always share a band and those within MAX_DISTANCE
+usually do, which is enough to spot a wave after a few copies; a lookup
+reads at most 4 x BUCKET_SIZE candidates. Old records are overwritten in
+ring order, which bounds memory regardless of traffic.
+"""
+
+import os
+import re
+import mmap
+import time
+import zlib
+import fcntl
+import hashlib
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+SLOT_COUNT = int(os.getenv('COMMENT_FINGERPRINT_SLOTS', '65536'))
+BUCKET_SIZE = 8  # Recent slots remembered per band value
+BANDS = 4
+BAND_BITS = 16
+FLOOD_WINDOW = int(os.getenv('COMMENT_FLOOD_WINDOW', '3600'))  # Seconds
+MAX_DISTANCE = 8  # Hamming distance that counts as a near-duplicate
+MIN_WORDS = 8  # Shorter comments ("Great article!") are never flagged
+FLOOD_PENDING_MATCHES = 2  # Near-duplicates from elsewhere before holding for review
+FLOOD_SPAM_MATCHES = 5  # ... before rejecting as spam
+
+_MAGIC = b'GPFPRNT1'
+_HEADER = np.dtype([('magic', 'S8'), ('slots', '<u8'), ('next_slot', '<u8')])
+_RECORD = np.dtype([('fingerprint', '<u8'), ('time', '<f8'), ('article', '<i8'), ('ip', '<u8')])
+_WORD = re.compile(r'[a-z0-9]+')
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+def default_path():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'globalperspective_comment_fingerprints')
+
+def simhash(text):
+    """64-bit SimHash of a comment's words, and the number of words"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0, 0
+    
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+         for word in words),
+        dtype=np.uint64, count=len(words)
+    )
+    votes = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0, dtype=np.int64) * 2 - len(words)
+    fingerprint = int.from_bytes(np.packbits(votes > 0, bitorder='little').tobytes(), 'little')
+    return fingerprint, len(words)
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+class FingerprintWindow:
+    """Sliding window of recent comment fingerprints shared through mmap"""
+    
+    def __init__(self, path=None, slots=SLOT_COUNT, window=FLOOD_WINDOW):
+        self.path = path or os.getenv('COMMENT_FINGERPRINT_PATH') or default_path()
+        self.slots = slots
+        self.window = window
+        self._pid = None
+        self._lock_handle = None
+        self._map = None
+    
+    def _size(self):
+        return (_HEADER.itemsize + _RECORD.itemsize * self.slots +
+                4 * BANDS * (1 << BAND_BITS) * BUCKET_SIZE + BANDS * (1 << BAND_BITS))
+    
+    def _attach(self):
+        # flock is per open file, so every forked worker needs its own handle
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock_handle = open(self.path + '.lock', 'a')
+        
+        with self._locked():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fresh = os.fstat(fd).st_size != self._size()
+                if fresh:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size())
+                self._map = mmap.mmap(fd, self._size())
+            finally:
+                os.close(fd)
+            
+            offset = 0
+            self.header = np.frombuffer(self._map, dtype=_HEADER, count=1, offset=offset)
+            offset += _HEADER.itemsize
+            self.records = np.frombuffer(self._map, dtype=_RECORD, count=self.slots, offset=offset)
+            offset += _RECORD.itemsize * self.slots
+            # Bucket entries are slot + 1 so that a zeroed file means empty
+            self.buckets = np.frombuffer(
+                self._map, dtype='<u4', count=BANDS * (1 << BAND_BITS) * BUCKET_SIZE, offset=offset
+            ).reshape(BANDS, 1 << BAND_BITS, BUCKET_SIZE)
+            offset += 4 * BANDS * (1 << BAND_BITS) * BUCKET_SIZE
+            self.bucket_cursors = np.frombuffer(
+                self._map, dtype='u1', count=BANDS * (1 << BAND_BITS), offset=offset
+            ).reshape(BANDS, 1 << BAND_BITS)
+            
+            if fresh or self.header['magic'][0] != _MAGIC or self.header['slots'][0] != self.slots:
+                self._map[:] = bytes(self._size())
+                self.header['magic'] = _MAGIC
+                self.header['slots'] = self.slots
+    
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._lock_handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _bands(fingerprint):
+        mask = (1 << BAND_BITS) - 1
+        return [(fingerprint >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+    
+    def check_and_add(self, text, article_id, ip_address):
+        """Record a comment and count recent near-duplicates posted elsewhere
+        
+        Returns {'verdict': None|'pending'|'spam', 'matches': n, 'distance': d}.
+        Comments too short to fingerprint reliably are neither checked nor stored.
+        """
+        fingerprint, words = simhash(text)
+        if words < MIN_WORDS:
+            return {'verdict': None, 'matches': 0, 'distance': None}
+        
+        self._attach()
+        ip_hash = zlib.crc32((ip_address or '').encode('utf-8'))
+        now = time.time()
+        bands = self._bands(fingerprint)
+        
+        with self._locked():
+            matches = 0
+            closest = None
+            seen = set()
+            for band, value in enumerate(bands):
+                for entry in self.buckets[band, value]:
+                    slot = int(entry) - 1
+                    if slot < 0 or slot in seen:
+                        continue
+                    seen.add(slot)
+                    record = self.records[slot]
+                    if now - record['time'] > self.window:
+                        continue
+                    distance = hamming_distance(int(record['fingerprint']), fingerprint)
+                    if distance > MAX_DISTANCE:
+                        continue  # Slot was reused, or only the band matched
+                    closest = distance if closest is None else min(closest, distance)
+                    if record['article'] != article_id or record['ip'] != ip_hash:
+                        matches += 1
+            
+            slot = int(self.header['next_slot'][0] % self.slots)
+            self.header['next_slot'] += 1
+            self.records[slot] = (fingerprint, now, article_id, ip_hash)
+            for band, value in enumerate(bands):
+                cursor = self.bucket_cursors[band, value]
+                self.buckets[band, value, cursor % BUCKET_SIZE] = slot + 1
+                self.bucket_cursors[band, value] = (cursor + 1) % BUCKET_SIZE
+        
+        verdict = None
+        if matches >= FLOOD_SPAM_MATCHES:
+            verdict = 'spam'
+        elif matches >= FLOOD_PENDING_MATCHES:
+            verdict = 'pending'
+        return {'verdict': verdict, 'matches': matches, 'distance': closest}
+
+comment_fingerprints = FingerprintWindow()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Comment Notification Outbox
+For GlobalPerspective News Platform
+
+Comment notifications are not sent on the request thread. enqueue() appends
+a row to a local SQLite outbox (WAL mode, so an insert is a few tens of
+microseconds and survives a worker crash) and background workers deliver
+them.
+
+Workers coalesce: pending notifications are grouped by recipient and kind,
+and a group is sent once its oldest entry is older than the recipient's
+digest window. Twelve comments in a burst become one "12 new comments"
+email. Groups are claimed under a lease inside an IMMEDIATE transaction,
+so any number of workers and processes can share one outbox file; failed
+sends are retried with exponential backoff.
+"""
+
+import os
+import html
+import json
+import time
+import sqlite3
+import threading
+
+OUTBOX_PATH = os.getenv('COMMENT_OUTBOX_PATH', 'comment_outbox.db')
+OUTBOX_WORKERS = int(os.getenv('COMMENT_OUTBOX_WORKERS', '2'))
+POLL_INTERVAL = 1.0  # Seconds between scans for due digests
+CLAIM_LEASE = 120  # Seconds a claimed group is hidden from other workers
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 30  # Seconds, doubled after each failed attempt
+SENT_RETENTION = 86400  # Seconds delivered rows are kept
+MAX_DIGEST_ITEMS = 1000  # Notifications claimed per digest
+DIGEST_EXCERPTS = 5  # Comments quoted in a digest body
+
+MODERATORS = 'moderators'  # Recipient for the review queue
+MODERATOR_EMAIL = os.getenv('COMMENT_MODERATOR_EMAIL', '')
+EMAIL_PROVIDER = os.getenv('COMMENT_NOTIFY_EMAIL_PROVIDER', '')  # smtp, sendgrid or mailgun; unset logs only
+
+# Kind -> default digest window in seconds (per-recipient windows override)
+DIGEST_WINDOWS = {
+    'article_author': 300,
+    'reply': 60,
+    'moderation': 120
+}
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY,
+        recipient TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        available_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbox_status_recipient ON outbox(status, recipient, kind, created_at);
+    CREATE TABLE IF NOT EXISTS digest_windows (
+        recipient TEXT PRIMARY KEY,
+        seconds REAL NOT NULL
+    );
+"""
+
+def render_digest(kind, items):
+    """Subject and text body for a group of notifications"""
+    count = len(items)
+    titles = sorted({item.get('article_title') or 'an article' for item in items})
+    where = f"'{titles[0]}'" if len(titles) == 1 else f"{len(titles)} articles"
+    
+    if kind == 'article_author':
+        subject = f"New comment on {where}" if count == 1 else f"{count} new comments on {where}"
+    elif kind == 'reply':
+        subject = "New reply to your comment" if count == 1 else f"{count} new replies to your comments"
+    else:
+        subject = "Comment awaiting review" if count == 1 else f"{count} comments awaiting review"
+    
+    lines = [
+        f"{item.get('author_name') or 'Anonymous'} on '{item.get('article_title')}': {item.get('excerpt', '')}"
+        for item in items[:DIGEST_EXCERPTS]
+    ]
+    if count > DIGEST_EXCERPTS:
+        lines.append(f"... and {count - DIGEST_EXCERPTS} more")
+    return subject, '\n'.join(lines)
+
+def log_sender(recipient, subject, body):
+    print(f"📧 {recipient}: {subject}")
+    return True
+
+class EmailSender:
+    """Deliver digests through email_verification_system.EmailService"""
+    
+    def __init__(self, provider):
+        from email_verification_system import EmailService
+        self.service = EmailService(provider)
+    
+    def __call__(self, recipient, subject, body):
+        address = MODERATOR_EMAIL if recipient == MODERATORS else recipient
+        if not address:
+            return log_sender(recipient, subject, body)
+        # Lines carry commenter-controlled text (names, titles, excerpts) in plain form
+        paragraphs = ''.join(f"<p>{html.escape(line)}</p>" for line in body.split('\n'))
+        return self.service.send_email(address, subject, paragraphs, body)
+
+class NotificationOutbox:
+    """Durable notification queue with digesting background workers"""
+    
+    def __init__(self, path=OUTBOX_PATH, workers=OUTBOX_WORKERS, sender=None):
+        self.path = path
+        self.workers = workers
+        self.sender = sender
+        self._local = threading.local()
+        self._threads = []
+        self._wake = threading.Event()
+        self.sent = 0
+        self.failed = 0
+    
+    def _connection(self):
+        # sqlite3 connections belong to one thread (and must not cross a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    def enqueue(self, recipient, kind, payload):
+        """Queue a notification; cheap enough for the request path"""
+        if not recipient:
+            return
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO outbox (recipient, kind, payload, created_at, available_at) VALUES (?, ?, ?, ?, ?)",
+            (recipient, kind, json.dumps(payload, separators=(',', ':')), now, now)
+        )
+        if DIGEST_WINDOWS.get(kind) == 0:
+            self._wake.set()
+    
+    def set_digest_window(self, recipient, seconds):
+        """Override the digest window for one recipient; None restores the defaults"""
+        connection = self._connection()
+        if seconds is None:
+            connection.execute("DELETE FROM digest_windows WHERE recipient = ?", (recipient,))
+        else:
+            connection.execute(
+                "INSERT INTO digest_windows (recipient, seconds) VALUES (?, ?) "
+                "ON CONFLICT (recipient) DO UPDATE SET seconds = excluded.seconds",
+                (recipient, float(seconds))
+            )
+    
+    def due_groups(self, now=None):
+        """(recipient, kind) groups whose oldest pending entry has waited out its window"""
+        now = now or time.time()
+        rows = self._connection().execute("""
+            SELECT o.recipient, o.kind, MIN(o.created_at), w.seconds
+            FROM outbox o LEFT JOIN digest_windows w ON w.recipient = o.recipient
+            WHERE o.status = 'pending' AND o.available_at <= ?
+            GROUP BY o.recipient, o.kind
+        """, (now,)).fetchall()
+        return [
+            (recipient, kind) for recipient, kind, oldest, window in rows
+            if oldest + (DIGEST_WINDOWS.get(kind, 0) if window is None else window) <= now
+        ]
+    
+    def _claim(self, recipient, kind, now):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute("""
+                SELECT id, payload, attempts FROM outbox
+                WHERE status = 'pending' AND recipient = ? AND kind = ? AND available_at <= ?
+                ORDER BY created_at LIMIT ?
+            """, (recipient, kind, now, MAX_DIGEST_ITEMS)).fetchall()
+            if rows:
+                connection.executemany(
+                    "UPDATE outbox SET available_at = ? WHERE id = ?",
+                    [(now + CLAIM_LEASE, row[0]) for row in rows]
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return rows
+    
+    def _finish(self, rows, delivered, now):
+        connection = self._connection()
+        if delivered:
+            connection.executemany(
+                "UPDATE outbox SET status = 'sent', finished_at = ? WHERE id = ?",
+                [(now, row[0]) for row in rows]
+            )
+            self.sent += len(rows)
+            return
+        
+        updates = []
+        for row_id, _, attempts in rows:
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                updates.append(('failed', now, attempts, now, row_id))
+                self.failed += 1
+            else:
+                updates.append(('pending', now + RETRY_DELAY * 2 ** (attempts - 1), attempts, None, row_id))
+        connection.executemany(
+            "UPDATE outbox SET status = ?, available_at = ?, attempts = ?, finished_at = ? WHERE id = ?",
+            updates
+        )
+    
+    def dispatch(self, now=None):
+        """Send every due digest once; returns the number of notifications delivered"""
+        now = now or time.time()
+        delivered = 0
+        
+        for recipient, kind in self.due_groups(now):
+            rows = self._claim(recipient, kind, now)
+            if not rows:
+                continue  # Another worker got there first
+            
+            subject, body = render_digest(kind, [json.loads(row[1]) for row in rows])
+            try:
+                ok = (self.sender or log_sender)(recipient, subject, body)
+            except Exception as e:
+                print(f"⚠️ Comment notification to {recipient} failed: {e}")
+                ok = False
+            self._finish(rows, ok, time.time())
+            if ok:
+                delivered += len(rows)
+        
+        return delivered
+    
+    def purge(self):
+        """Drop delivered rows past the retention period"""
+        self._connection().execute(
+            "DELETE FROM outbox WHERE status = 'sent' AND finished_at < ?",
+            (time.time() - SENT_RETENTION,)
+        )
+    
+    def stats(self):
+        counts = dict(self._connection().execute(
+            "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+        ).fetchall())
+        oldest = self._connection().execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status = 'pending'"
+        ).fetchone()[0]
+        return {
+            'pending': counts.get('pending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_pending_seconds': round(time.time() - oldest, 1) if oldest else None,
+            'workers': len(self._threads),
+            'path': self.path
+        }
+    
+    def start(self):
+        """Start the delivery workers for this process"""
+        if self._threads:
+            return
+        if self.sender is None and EMAIL_PROVIDER:
+            self.sender = EmailSender(EMAIL_PROVIDER)
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(number,), name=f'comment-outbox-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _run(self, number):
+        last_purge = time.time()
+        while True:
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                self.dispatch()
+                if number == 0 and time.time() - last_purge > 3600:
+                    self.purge()
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"⚠️ Comment outbox worker failed: {e}")
+
+comment_outbox = NotificationOutbox()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Comment Reputation Store
+For GlobalPerspective News Platform
+
+Remembers how each IP prefix, email domain and user has behaved: recent
+posting velocity, spam verdicts and upheld reports. Counters decay
+exponentially, so an entry is just its last-update time plus four floats
+and every update is O(1).
+
+Entries live in a fixed-size hash table in a file mapped into every worker
+on the host (/dev/shm when available), so all workers count against the
+same limits:
+
+    header | REPUTATION_MAX_ENTRIES records of (key hash, updated at, burst, posts, spam, reports)
+
+A key probes up to PROBE_LENGTH slots from its hash; when all are taken the
+least recently updated one is evicted. One worker per interval copies the
+table to REPUTATION_SNAPSHOT_PATH, and a fresh table (after a reboot) is
+seeded from that copy.
+
+Webmail domains (gmail.com and the like) are shared by unrelated people
+and get no domain key at all.
+"""
+
+import os
+import mmap
+import time
+import fcntl
+import atexit
+import hashlib
+import tempfile
+import threading
+import ipaddress
+from contextlib import contextmanager
+import numpy as np
+
+REPUTATION_MAX_ENTRIES = int(os.getenv('REPUTATION_MAX_ENTRIES', '50000'))
+REPUTATION_SNAPSHOT_PATH = os.getenv('REPUTATION_SNAPSHOT_PATH', 'comment_reputation.snapshot')
+REPUTATION_SNAPSHOT_INTERVAL = 300  # Seconds
+PROBE_LENGTH = 8  # Slots searched per key before evicting
+
+# Counter -> half-life in seconds
+COUNTERS = {
+    'burst': 600,  # Posts in roughly the last ten minutes
+    'posts': 7 * 86400,
+    'spam': 7 * 86400,
+    'reports': 7 * 86400  # Reported comments a moderator removed
+}
+_INDEX = {name: position for position, name in enumerate(COUNTERS)}
+_HALF_LIVES = np.array(list(COUNTERS.values()), dtype=np.float64)
+
+# Domains shared by unrelated commenters; no domain-level reputation for these
+SHARED_EMAIL_DOMAINS = frozenset([
+    'gmail.com', 'googlemail.com', 'outlook.com', 'hotmail.com', 'live.com', 'msn.com',
+    'yahoo.com', 'ymail.com', 'icloud.com', 'me.com', 'mac.com', 'aol.com', 'proton.me',
+    'protonmail.com', 'gmx.com', 'gmx.de', 'gmx.net', 'web.de', 'mail.com', 'mail.ru',
+    'yandex.ru', 'yandex.com', 'zoho.com', 'qq.com', '163.com', 'fastmail.com'
+] + [domain.strip().lower() for domain in os.getenv('REPUTATION_SHARED_DOMAINS', '').split(',') if domain.strip()])
+
+# Scoring thresholds
+BURST_THROTTLE = {'ip': 20, 'domain': 200, 'user': 15}  # Decayed burst count that gets a 429
+BURST_SUSPICIOUS = {'ip': 8, 'domain': 80, 'user': 6}
+SPAM_HISTORY_MIN = 3  # Spam verdicts before history counts
+SPAM_HISTORY_RATIO = 0.5  # ... and their share of posts
+REPORTS_SUSPICIOUS = 5
+
+_MAGIC = b'GPREPUT2'
+_HEADER = np.dtype([('magic', 'S8'), ('slots', '<u8'), ('updated_at', '<f8'), ('snapshot_at', '<f8')])
+_RECORD = np.dtype([('key', '<u8'), ('updated_at', '<f8'), ('counters', '<f8', (len(COUNTERS),))])
+
+def default_path():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'globalperspective_comment_reputation')
+
+def reputation_keys(ip_address=None, email=None, user_id=None):
+    """Store keys for a commenter: IP prefix (/24 or /64), email domain, user"""
+    keys = []
+    if ip_address:
+        try:
+            address = ipaddress.ip_address(ip_address)
+            prefix = 24 if address.version == 4 else 64
+            keys.append('ip:' + str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)))
+        except ValueError:
+            pass
+    if email and '@' in email:
+        domain = email.rsplit('@', 1)[1].lower()
+        if domain not in SHARED_EMAIL_DOMAINS:
+            keys.append('domain:' + domain)
+    if user_id:
+        keys.append(f"user:{user_id}")
+    return keys
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+class ReputationStore:
+    """Exponentially decayed behaviour counters shared through mmap"""
+    
+    def __init__(self, max_entries=REPUTATION_MAX_ENTRIES, path=None, snapshot_path=REPUTATION_SNAPSHOT_PATH):
+        self.max_entries = max_entries
+        self.path = path or os.getenv('REPUTATION_STORE_PATH') or default_path()
+        self.snapshot_path = snapshot_path
+        self._pid = None
+        self._lock = None
+        self._lock_handle = None
+        self._map = None
+        self._thread = None
+        self.evictions = 0
+    
+    def _size(self):
+        return _HEADER.itemsize + _RECORD.itemsize * self.max_entries
+    
+    def _attach(self):
+        # flock is per open file, so every forked worker needs its own handle
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._lock_handle = open(self.path + '.lock', 'a')
+        
+        with self._locked():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fresh = os.fstat(fd).st_size != self._size()
+                if fresh:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size())
+                self._map = mmap.mmap(fd, self._size())
+            finally:
+                os.close(fd)
+            
+            self.header = np.frombuffer(self._map, dtype=_HEADER, count=1)
+            self.records = np.frombuffer(self._map, dtype=_RECORD, count=self.max_entries, offset=_HEADER.itemsize)
+            
+            if fresh or self.header['magic'][0] != _MAGIC or self.header['slots'][0] != self.max_entries:
+                self._map[:] = bytes(self._size())
+                self.header['magic'] = _MAGIC
+                self.header['slots'] = self.max_entries
+                self._load_snapshot()
+    
+    @contextmanager
+    def _locked(self):
+        # The thread lock covers threads sharing this process's flock handle
+        with self._lock:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+    
+    def _slot(self, key_hash, create):
+        """Slot holding key_hash; with create, claim a free or the stalest slot"""
+        # Caller holds the lock
+        base = key_hash % self.max_entries
+        free = None
+        stalest = None
+        for probe in range(PROBE_LENGTH):
+            slot = (base + probe) % self.max_entries
+            stored = int(self.records['key'][slot])
+            if stored == key_hash:
+                return slot
+            if stored == 0:
+                if free is None:
+                    free = slot
+            elif stalest is None or self.records['updated_at'][slot] < self.records['updated_at'][stalest]:
+                stalest = slot
+        
+        if not create:
+            return None
+        if free is None:
+            free = stalest
+            self.evictions += 1
+        self.records[free] = (key_hash, time.time(), np.zeros(len(COUNTERS)))
+        return free
+    
+    def _decayed(self, slot, now):
+        # Caller holds the lock
+        record = self.records[slot]
+        elapsed = now - record['updated_at']
+        if elapsed > 0:
+            record['counters'] *= 0.5 ** (elapsed / _HALF_LIVES)
+            record['updated_at'] = now
+        return record['counters']
+    
+    def record(self, keys, counter, amount=1.0):
+        """Add to a counter for every key"""
+        self._attach()
+        now = time.time()
+        with self._locked():
+            for key in keys:
+                counters = self._decayed(self._slot(_key_hash(key), True), now)
+                counters[_INDEX[counter]] += amount
+                if counter == 'posts':
+                    counters[_INDEX['burst']] += amount
+            self.header['updated_at'] = now
+    
+    def counters(self, key):
+        """Current decayed counters for a key"""
+        self._attach()
+        now = time.time()
+        with self._locked():
+            slot = self._slot(_key_hash(key), False)
+            if slot is None:
+                return dict.fromkeys(COUNTERS, 0.0)
+            counters = self._decayed(slot, now)
+            return {name: float(counters[_INDEX[name]]) for name in COUNTERS}
+    
+    def assess(self, keys):
+        """Spam-score points and throttling for a commenter
+        
+        Returns {'points': n, 'reasons': [...], 'throttled': bool}.
+        """
+        points = 0
+        reasons = []
+        throttled = False
+        
+        for key in keys:
+            kind = key.split(':', 1)[0]
+            counts = self.counters(key)
+            
+            if counts['burst'] >= BURST_THROTTLE[kind]:
+                throttled = True
+            elif counts['burst'] >= BURST_SUSPICIOUS[kind]:
+                points += 2
+                reasons.append(f"High posting velocity from {key}")
+            
+            if (counts['spam'] >= SPAM_HISTORY_MIN and
+                    counts['spam'] >= SPAM_HISTORY_RATIO * max(counts['posts'], 1)):
+                points += 3
+                reasons.append(f"Spam history for {key}")
+            
+            if counts['reports'] >= REPORTS_SUSPICIOUS:
+                points += 2
+                reasons.append(f"Frequently reported: {key}")
+        
+        return {'points': points, 'reasons': reasons, 'throttled': throttled}
+    
+    def stats(self):
+        self._attach()
+        with self._locked():
+            entries = int(np.count_nonzero(self.records['key']))
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'path': self.path
+        }
+    
+    def start(self):
+        """Attach to the shared table and snapshot it in the background"""
+        if self._thread is not None:
+            return
+        self._attach()
+        self._thread = threading.Thread(target=self._run, name='comment-reputation-snapshot', daemon=True)
+        self._thread.start()
+        atexit.register(self.snapshot)
+    
+    def _load_snapshot(self):
+        # Caller holds the lock on a freshly zeroed table
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                saved = f.read()
+        except OSError:
+            return False
+        if len(saved) != self._size() or np.frombuffer(saved, dtype=_HEADER, count=1)['magic'][0] != _MAGIC:
+            return False
+        self._map[:] = saved
+        self.header['snapshot_at'] = time.time()
+        return True
+    
+    def snapshot(self, min_interval=0):
+        """Copy the table to disk atomically if it changed since the last copy by any worker"""
+        self._attach()
+        now = time.time()
+        with self._locked():
+            last = self.header['snapshot_at'][0]
+            if self.header['updated_at'][0] <= last or now - last < min_interval:
+                return False
+            self.header['snapshot_at'] = now
+            data = bytes(self._map)
+        
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.snapshot')
+        with os.fdopen(handle, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self.snapshot_path)
+        return True
+    
+    def _run(self):
+        while True:
+            time.sleep(REPUTATION_SNAPSHOT_INTERVAL)
+            try:
+                # Workers share the table, so whichever gets here first writes it
+                self.snapshot(min_interval=REPUTATION_SNAPSHOT_INTERVAL / 2)
+            except Exception as e:
+                print(f"⚠️ Reputation snapshot failed: {e}")
+
+comment_reputation = ReputationStore()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Live Comment Stream Broker
+For GlobalPerspective News Platform
+
+Fans comment events out to Server-Sent Events subscribers of an article.
+
+publish() appends the event to a shared SQLite log (WAL mode, one insert
+of a few tens of microseconds), so it reaches subscribers in every worker
+process on the host, not just the one that handled the write. Each process
+with subscribers runs one relay thread that tails the log every
+STREAM_POLL_INTERVAL and hands new events to the article's channel: a
+bounded ring of recent frames plus a condition variable. The frame is
+formatted once per process and listeners are woken together, so the cost
+does not grow with the number of subscribers. Event ids are log row ids,
+so they mean the same thing in every worker.
+
+An open stream holds its request worker for as long as it stays
+connected, which only scales under cooperative workers (gunicorn -k
+gevent or eventlet), where an idle subscriber is a parked greenlet. Under
+sync or threaded workers a handful of streams would starve the site, so
+available() is false and the route answers 503: clients fall back to
+polling. COMMENT_STREAM_REQUIRE_COOPERATIVE=0 lifts that for development
+servers.
+
+Backpressure: a subscriber reads at the pace its socket drains, and the
+publisher never waits for it. A subscriber that falls more than
+STREAM_REPLAY_EVENTS behind gets a 'reset' event (refetch the comments)
+instead of an unbounded queue. The same ring serves Last-Event-ID replay
+after a reconnect; a reconnect to a worker whose ring does not reach back
+that far gets a 'reset' too.
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import sqlite3
+import threading
+from collections import deque
+
+STREAM_LOG_PATH = os.getenv('COMMENT_STREAM_LOG_PATH', 'comment_stream.db')
+STREAM_REQUIRE_COOPERATIVE = os.getenv('COMMENT_STREAM_REQUIRE_COOPERATIVE', '1') == '1'
+STREAM_REPLAY_EVENTS = 256  # Events kept per article for replay and slow readers
+STREAM_HEARTBEAT = 15  # Seconds between keep-alive comments
+STREAM_RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
+STREAM_CHANNEL_TTL = 600  # Seconds an article without subscribers keeps its replay buffer
+STREAM_MAX_SUBSCRIBERS = int(os.getenv('COMMENT_STREAM_MAX_SUBSCRIBERS', '5000'))  # Per process
+STREAM_POLL_INTERVAL = 0.25  # Seconds between reads of the shared log
+STREAM_RELAY_BATCH = 1000  # Log rows read per poll
+STREAM_LOG_RETENTION = 600  # Seconds events stay in the shared log
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id INTEGER NOT NULL,
+        event TEXT NOT NULL,
+        key TEXT,
+        payload TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_created_at ON events(created_at);
+    CREATE TABLE IF NOT EXISTS meta (
+        name TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+"""
+
+def cooperative_worker():
+    """True when running under gevent or eventlet monkey-patching"""
+    # Only look at modules the worker already imported; never import them here
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return True
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    if eventlet_patcher is not None and eventlet_patcher.is_monkey_patched('thread'):
+        return True
+    return False
+
+class _Channel:
+    __slots__ = ('condition', 'events', 'last_seq', 'dropped_through', 'subscribers', 'idle_since')
+    
+    def __init__(self, replay, position):
+        self.condition = threading.Condition(threading.Lock())
+        self.events = deque(maxlen=replay)  # (seq, event, key, frame)
+        self.last_seq = position
+        self.dropped_through = position  # Events up to here are not in the ring
+        self.subscribers = 0
+        self.idle_since = time.monotonic()
+
+class CommentStreamBroker:
+    """Per-article event rings fed from a log shared by every worker process"""
+    
+    def __init__(self, path=STREAM_LOG_PATH, replay=STREAM_REPLAY_EVENTS, max_subscribers=STREAM_MAX_SUBSCRIBERS,
+                 require_cooperative=STREAM_REQUIRE_COOPERATIVE):
+        self.path = path
+        self.replay = replay
+        self.max_subscribers = max_subscribers
+        self.require_cooperative = require_cooperative
+        self._local = threading.local()
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+        self._purged_at = time.monotonic()
+        self._relay_pid = None
+        self._epoch = None
+        self.position = 0  # Last log row this process relayed
+        self.subscribers = 0
+        self.published = 0
+        self.relayed = 0
+        self.resets = 0
+    
+    def _connection(self):
+        # sqlite3 connections belong to one thread (and must not cross a fork)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    @property
+    def epoch(self):
+        # Shared through the log, so ids from any worker replay anywhere; a new log file starts a new epoch
+        if self._epoch is None:
+            connection = self._connection()
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('epoch', ?)", (secrets.token_hex(4),))
+            self._epoch = connection.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+        return self._epoch
+    
+    def available(self):
+        """Whether this process can hold streams open without starving other requests"""
+        return not self.require_cooperative or cooperative_worker()
+    
+    def publish(self, article_id, event, data, key=None):
+        """Send an event to the article's subscribers in every worker
+        
+        Events sharing a key (e.g. like counts for one comment) are
+        coalesced when a reader is behind: it only gets the latest.
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT INTO events (article_id, event, key, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+            (article_id, event, None if key is None else json.dumps(key, default=str),
+             json.dumps(data, separators=(',', ':'), default=str), now)
+        )
+        self.published += 1
+        
+        # Old events are purged as new ones are written, so the log stays bounded
+        if time.monotonic() - self._purged_at > 60:
+            self._purged_at = time.monotonic()
+            connection.execute("DELETE FROM events WHERE created_at < ?", (now - STREAM_LOG_RETENTION,))
+    
+    def relay(self):
+        """Move new log events into this process's channels; returns the rows read"""
+        rows = self._connection().execute(
+            "SELECT id, article_id, event, key, payload FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (self.position, STREAM_RELAY_BATCH)
+        ).fetchall()
+        
+        for seq, article_id, event, key, payload in rows:
+            self.position = seq
+            with self._lock:
+                channel = self._channels.get(article_id)
+            if channel is None:
+                continue  # Nobody here is listening and nobody will replay
+            
+            frame = f"id: {self.epoch}-{seq}\nevent: {event}\ndata: {payload}\n\n"
+            with channel.condition:
+                if len(channel.events) == channel.events.maxlen:
+                    channel.dropped_through = channel.events[0][0]
+                channel.events.append((seq, event, key, frame))
+                channel.last_seq = seq
+                channel.condition.notify_all()
+            self.relayed += 1
+        return len(rows)
+    
+    def _start_relay(self):
+        # Caller holds self._lock. Threads do not survive a fork, so each worker starts its own
+        if self._relay_pid == os.getpid():
+            return
+        self._relay_pid = os.getpid()
+        row = self._connection().execute("SELECT MAX(id) FROM events").fetchone()
+        self.position = row[0] or 0  # Earlier events went to nobody in this process
+        threading.Thread(target=self._run, name='comment-stream-relay', daemon=True).start()
+    
+    def _run(self):
+        while True:
+            try:
+                # A full batch means the log is ahead; read on without sleeping
+                if self.relay() < STREAM_RELAY_BATCH:
+                    time.sleep(STREAM_POLL_INTERVAL)
+            except Exception as e:
+                print(f"⚠️ Comment stream relay failed: {e}")
+                time.sleep(STREAM_POLL_INTERVAL)
+    
+    def _subscribe(self, article_id):
+        with self._lock:
+            if self.subscribers >= self.max_subscribers:
+                return None
+            self._start_relay()
+            self._sweep()
+            channel = self._channels.get(article_id)
+            if channel is None:
+                channel = self._channels[article_id] = _Channel(self.replay, self.position)
+            channel.subscribers += 1
+            self.subscribers += 1
+            return channel
+    
+    def _unsubscribe(self, channel):
+        with self._lock:
+            channel.subscribers -= 1
+            self.subscribers -= 1
+            if not channel.subscribers:
+                channel.idle_since = time.monotonic()
+    
+    def _sweep(self):
+        # Caller holds self._lock
+        now = time.monotonic()
+        if now - self._swept_at < 60:
+            return
+        self._swept_at = now
+        for article_id in [article_id for article_id, channel in self._channels.items()
+                           if not channel.subscribers and now - channel.idle_since > STREAM_CHANNEL_TTL]:
+            del self._channels[article_id]
+    
+    def _start_seq(self, channel, last_event_id):
+        """Sequence number to resume after, and whether the client must refetch"""
+        with channel.condition:
+            current = channel.last_seq
+            dropped_through = channel.dropped_through
+        if not last_event_id:
+            return current, False
+        
+        # Ids are global, so one this process has not relayed yet is still valid to resume after
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit() or int(seq) < dropped_through:
+            return current, True
+        return int(seq), False
+    
+    @staticmethod
+    def _read(channel, cursor):
+        """Frames after cursor, coalesced; (frames, new cursor, lost events)"""
+        events = channel.events
+        lost = cursor < channel.dropped_through
+        if not events or events[-1][0] <= cursor:
+            return [], max(cursor, channel.dropped_through), lost
+        
+        pending = [entry for entry in events if entry[0] > cursor]
+        latest = {}
+        for seq, _, key, _ in pending:
+            if key is not None:
+                latest[key] = seq
+        frames = [frame for seq, _, key, frame in pending if key is None or latest[key] == seq]
+        return frames, events[-1][0], lost
+    
+    def stream(self, article_id, last_event_id=None):
+        """SSE frame generator for one subscriber, or None if the process is full"""
+        if self.subscribers >= self.max_subscribers:
+            return None
+        
+        def frames():
+            # Subscribe on first read: the finally below only runs once the generator has started
+            channel = self._subscribe(article_id)
+            if channel is None:
+                yield f"retry: {STREAM_RETRY_MS}\n\n"
+                return
+            try:
+                cursor, reset = self._start_seq(channel, last_event_id)
+                yield f"retry: {STREAM_RETRY_MS}\n\n"
+                if reset:
+                    self.resets += 1
+                    yield f"id: {self.epoch}-{cursor}\nevent: reset\ndata: {{}}\n\n"
+                
+                while True:
+                    with channel.condition:
+                        if channel.last_seq <= cursor:
+                            channel.condition.wait(STREAM_HEARTBEAT)
+                        batch, cursor, lost = self._read(channel, cursor)
+                    
+                    if lost:
+                        # Fell behind the ring: skip to the end and refetch
+                        self.resets += 1
+                        yield f"id: {self.epoch}-{cursor}\nevent: reset\ndata: {{}}\n\n"
+                    elif batch:
+                        yield ''.join(batch)
+                    else:
+                        yield ": keep-alive\n\n"
+            finally:
+                self._unsubscribe(channel)
+        
+        return frames()
+    
+    def stats(self):
+        with self._lock:
+            channels = len(self._channels)
+        return {
+            'available': self.available(),
+            'subscribers': self.subscribers,
+            'max_subscribers': self.max_subscribers,
+            'channels': channels,
+            'published': self.published,
+            'relayed': self.relayed,
+            'position': self.position,
+            'resets': self.resets,
+            'path': self.path
+        }
+
+comment_stream = CommentStreamBroker()
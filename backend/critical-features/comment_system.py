@@ -4,14 +4,31 @@ Complete Comment System with Moderation
 For GlobalPerspective News Platform
 """
 
-from flask import Flask, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask import Flask, request, jsonify, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import os
 import re
+import json
+import time
+import atexit
+import math
 import hashlib
+import threading
 from functools import wraps
+import base64
+import html
 import bleach
 from urllib.parse import urlparse
+from sqlalchemy import func, or_, and_, tuple_, bindparam, select
+from sqlalchemy.exc import IntegrityError
+from spam_classifier import spam_classifier, comment_features
+from comment_fingerprints import comment_fingerprints
+from comment_reputation import comment_reputation, reputation_keys
+from comment_notifications import comment_outbox, MODERATORS
+from comment_stream import comment_stream
+from identity_cache import identity_cache
 
 # Comment validation and sanitization
 class CommentValidator:
@@ -29,9 +46,31 @@ class CommentValidator:
         'lose weight', 'diet pills', 'enlargement', 'mortgage'
     ]
     
+    # Sanitization fast path. Without '<', '&' or the C0 controls html5lib
+    # rewrites (all but tab, LF and CR), bleach.clean only escapes '>', so
+    # the parse can be skipped.
+    MARKUP_PATTERN = re.compile(r'[<&\x00-\x08\x0b\x0c\x0e-\x1f]')
+    SANITIZE_MEMO_SIZE = 4096  # Cleaned markup bodies remembered by content hash
+    _sanitize_memo = OrderedDict()
+    _sanitize_lock = threading.Lock()
+    sanitize_stats = {'plain': 0, 'memo_hits': 0, 'parsed': 0}
+    
     @staticmethod
     def sanitize_content(content):
         """Sanitize comment content"""
+        if not CommentValidator.MARKUP_PATTERN.search(content):
+            CommentValidator.sanitize_stats['plain'] += 1
+            return re.sub(r'\s+', ' ', content.replace('>', '&gt;')).strip()
+        
+        # Spam waves repeat the same body, so remember recent results
+        digest = hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        with CommentValidator._sanitize_lock:
+            clean_content = CommentValidator._sanitize_memo.get(digest)
+            if clean_content is not None:
+                CommentValidator._sanitize_memo.move_to_end(digest)
+                CommentValidator.sanitize_stats['memo_hits'] += 1
+                return clean_content
+        
         # Remove dangerous HTML
         clean_content = bleach.clean(
             content,
@@ -43,6 +82,12 @@ class CommentValidator:
         # Remove excessive whitespace
         clean_content = re.sub(r'\s+', ' ', clean_content).strip()
         
+        with CommentValidator._sanitize_lock:
+            CommentValidator._sanitize_memo[digest] = clean_content
+            if len(CommentValidator._sanitize_memo) > CommentValidator.SANITIZE_MEMO_SIZE:
+                CommentValidator._sanitize_memo.popitem(last=False)
+            CommentValidator.sanitize_stats['parsed'] += 1
+        
         return clean_content
     
     @staticmethod
@@ -79,33 +124,47 @@ class CommentValidator:
         return errors
     
     @staticmethod
-    def detect_spam(content, author_email=None, author_website=None):
-        """Detect potential spam in comments"""
+    def spam_matcher():
+        """Compiled keyword matcher, reloaded when SPAM_KEYWORDS_PATH changes"""
+        return _spam_keywords.matcher()
+    
+    @staticmethod
+    def set_spam_keywords(keywords):
+        """Replace the spam keyword list at runtime"""
+        _spam_keywords.replace(keywords)
+    
+    @staticmethod
+    def detect_spam(content, author_email=None, author_website=None, reputation=None):
+        """Detect potential spam in comments
+        
+        reputation is an assessment from comment_reputation.assess() for the
+        commenter; its points and reasons are added to the heuristics.
+        """
         spam_score = 0
         reasons = []
         
-        content_lower = content.lower()
+        # Keywords, links, capitals and repeated characters in one pass
+        scan = scan_comment_text(content, CommentValidator.spam_matcher())
         
         # Check for spam keywords
-        for keyword in CommentValidator.SPAM_KEYWORDS:
-            if keyword in content_lower:
-                spam_score += 2
-                reasons.append(f"Contains spam keyword: {keyword}")
+        for keyword in scan['keywords']:
+            spam_score += 2
+            reasons.append(f"Contains spam keyword: {keyword}")
         
         # Check for excessive links
-        link_count = len(re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', content))
+        link_count = scan['link_count']
         if link_count > 2:
             spam_score += link_count
             reasons.append(f"Too many links: {link_count}")
         
         # Check for excessive capitalization
-        caps_ratio = sum(1 for c in content if c.isupper()) / max(len(content), 1)
+        caps_ratio = scan['caps_count'] / max(len(content), 1)
         if caps_ratio > 0.3:
             spam_score += 3
             reasons.append("Excessive capitalization")
         
         # Check for repeated characters
-        if re.search(r'(.)\1{4,}', content):
+        if scan['longest_run'] >= 5:
             spam_score += 2
             reasons.append("Repeated characters")
         
@@ -117,6 +176,11 @@ class CommentValidator:
                 spam_score += 3
                 reasons.append("Suspicious email domain")
         
+        # Past behaviour of this IP range, email domain and user
+        if reputation:
+            spam_score += reputation['points']
+            reasons.extend(reputation['reasons'])
+        
         # Determine spam status
         is_spam = spam_score >= 5
         is_suspicious = spam_score >= 3
@@ -127,9 +191,210 @@ class CommentValidator:
             'spam_score': spam_score,
             'reasons': reasons
         }
+    
+    # Classifier probability -> heuristic score points
+    CLASSIFIER_POINTS = [(0.99, 5), (0.9, 3), (0.05, 0)]
+    CLASSIFIER_HAM_POINTS = -2  # Below the lowest threshold
+    
+    @staticmethod
+    def apply_classifier(spam_check, probability):
+        """Combine a detect_spam result with the trained classifier's probability"""
+        if probability is None:
+            return spam_check
+        
+        points = CommentValidator.CLASSIFIER_HAM_POINTS
+        for threshold, threshold_points in CommentValidator.CLASSIFIER_POINTS:
+            if probability >= threshold:
+                points = threshold_points
+                break
+        
+        spam_score = spam_check['spam_score'] + points
+        reasons = list(spam_check['reasons'])
+        if points:
+            reasons.append(f"Classifier spam probability: {probability:.2f}")
+        
+        return {
+            'is_spam': spam_score >= 5,
+            'is_suspicious': spam_score >= 3,
+            'spam_score': spam_score,
+            'reasons': reasons,
+            'spam_probability': probability
+        }
+
+# Single-pass spam heuristics
+_LINK = object()  # Automaton output marking an http:// or https:// prefix
+
+# Characters the old link regex accepted after the scheme
+_URL_CHARS = frozenset(
+    [chr(code) for code in range(ord('$'), ord('_') + 1)] +
+    list('abcdefghijklmnopqrstuvwxyz@.&+!*(),')
+)
+
+class KeywordMatcher:
+    """Aho–Corasick automaton for case-insensitive keyword search
+    
+    Transitions are compiled into one dict per state with failure links
+    already followed, so a scan is a single dict lookup per character no
+    matter how many keywords there are.
+    """
+    
+    def __init__(self, keywords, extra_patterns=()):
+        self.keywords = sorted({keyword.strip().lower() for keyword in keywords if keyword.strip()})
+        patterns = [(keyword, keyword) for keyword in self.keywords] + list(extra_patterns)
+        
+        # Trie
+        goto = [{}]
+        outputs = [set()]
+        for text, label in patterns:
+            state = 0
+            for ch in text:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    goto.append({})
+                    outputs.append(set())
+                    next_state = len(goto) - 1
+                    goto[state][ch] = next_state
+                state = next_state
+            outputs[state].add(label)
+        
+        # Breadth-first: failure links, then full transition tables
+        fail = [0] * len(goto)
+        transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            transitions[state] = dict(transitions[fail[state]])
+            transitions[state].update(goto[state])
+            outputs[state] |= outputs[fail[state]]
+            for ch, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(ch, 0) if state else 0
+                queue.append(next_state)
+        
+        self.transitions = transitions
+        self.outputs = [frozenset(labels) if labels else None for labels in outputs]
+    
+    def find(self, text):
+        """Keywords occurring anywhere in text"""
+        found = set()
+        state = 0
+        transitions, outputs = self.transitions, self.outputs
+        for ch in text.lower():
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+_ASCII_CAPITALS = bytes(range(ord('A'), ord('Z') + 1))
+
+def count_capitals(content):
+    if content.isascii():
+        raw = content.encode('ascii')
+        return len(raw) - len(raw.translate(None, _ASCII_CAPITALS))
+    return sum(map(str.isupper, content))
+
+def scan_comment_text(content, matcher):
+    """Keywords, link count, capital count and longest character run
+    
+    matcher must include the _LINK patterns (see _KeywordSource). Keywords,
+    links and runs come from one pass over the lowercased text; capitals
+    are counted in C beforehand. A link is a scheme followed by at least one
+    URL character, as with the old regex, but the scheme is matched in any
+    case. Runs ignore case and do not span newlines.
+    """
+    transitions, outputs = matcher.transitions, matcher.outputs
+    
+    found = set()
+    state = 0
+    links = 0
+    run = 0
+    longest = 1 if content else 0
+    previous = None
+    link_pending = in_url = False
+    
+    for ch in content.lower():
+        if ch == previous:
+            run += 1
+            if run > longest:
+                longest = run
+        else:
+            run = 1
+            previous = ch if ch != '\n' else None
+        
+        if link_pending:
+            link_pending = False
+            if ch in _URL_CHARS:
+                links += 1
+                in_url = True
+        elif in_url and ch not in _URL_CHARS:
+            in_url = False
+        
+        state = transitions[state].get(ch, 0)
+        if outputs[state]:
+            hits = outputs[state]
+            if _LINK in hits:
+                hits = hits - {_LINK}
+                link_pending = not in_url
+            found |= hits
+    
+    return {
+        'keywords': sorted(found),
+        'link_count': links,
+        'caps_count': count_capitals(content),
+        'longest_run': longest
+    }
+
+SPAM_KEYWORDS_PATH = os.getenv('SPAM_KEYWORDS_PATH')  # One keyword per line
+SPAM_KEYWORDS_CHECK_INTERVAL = 5  # Seconds between file modification checks
+
+class _KeywordSource:
+    """Current spam keyword matcher, rebuilt when the keyword file changes"""
+    
+    def __init__(self, defaults, path=None):
+        self._lock = threading.Lock()
+        self._path = path
+        self._mtime = None
+        self._checked_at = 0.0
+        self._matcher = self._compile(defaults)
+    
+    @staticmethod
+    def _compile(keywords):
+        return KeywordMatcher(keywords, extra_patterns=[('http://', _LINK), ('https://', _LINK)])
+    
+    def replace(self, keywords):
+        matcher = self._compile(keywords)
+        with self._lock:
+            self._matcher = matcher
+    
+    def matcher(self):
+        if self._path and time.monotonic() - self._checked_at >= SPAM_KEYWORDS_CHECK_INTERVAL:
+            self._reload()
+        return self._matcher
+    
+    def _reload(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self._path)
+                if mtime == self._mtime:
+                    return
+                with open(self._path, encoding='utf-8') as f:
+                    keywords = [line for line in f.read().splitlines() if not line.startswith('#')]
+                self._matcher = self._compile(keywords)
+                self._mtime = mtime
+            except OSError as e:
+                print(f"⚠️ Could not load spam keywords from {self._path}: {e}")
+
+_spam_keywords = _KeywordSource(CommentValidator.SPAM_KEYWORDS, SPAM_KEYWORDS_PATH)
 
 # Comment threading utilities
 class CommentThreading:
+    # Replies may nest this many levels below a top-level comment
+    MAX_DEPTH = 5
+    
+    # Materialized paths are the ancestor ids, zero-padded so that string
+    # order matches tree order: '0000000012/0000000045/'. A subtree is then
+    # one range scan on (article_id, path).
+    PATH_SEGMENT_WIDTH = 10
+    
     @staticmethod
     def build_comment_tree(comments):
         """Build hierarchical comment tree"""
@@ -149,43 +414,573 @@ class CommentThreading:
         return root_comments
     
     @staticmethod
-    def get_comment_depth(comment, max_depth=5):
-        """Calculate comment nesting depth"""
-        depth = 0
-        current = comment
-        
-        while current.parent_id and depth < max_depth:
-            current = Comment.query.get(current.parent_id)
-            if not current:
+    def get_comment_depth(comment, max_depth=MAX_DEPTH):
+        """Comment nesting depth, read from the stored depth column"""
+        return min(comment.depth or 0, max_depth)
+    
+    @staticmethod
+    def path_segment(comment_id):
+        return f"{comment_id:0{CommentThreading.PATH_SEGMENT_WIDTH}d}/"
+    
+    @staticmethod
+    def assign_thread_position(comment, parent=None):
+        """Set depth and path on a flushed comment (its id must be known)
+        
+        A parent written before paths were stored (see backfill-comment-paths)
+        gets its own position first, walking up through its ancestors.
+        """
+        if parent is not None and parent.path is None:
+            CommentThreading.assign_thread_position(parent, parent.parent)
+        if parent is None:
+            comment.depth = 0
+            comment.path = CommentThreading.path_segment(comment.id)
+        else:
+            comment.depth = parent.depth + 1
+            comment.path = parent.path + CommentThreading.path_segment(comment.id)
+    
+    @staticmethod
+    def subtree_filter(Comment, comment):
+        """Filter matching every descendant of comment via an index range scan"""
+        # A prefix match rather than an explicit [path, path + '0') range: that
+        # range relies on '/' sorting below '0', which holds bytewise but not
+        # under every linguistic collation. Databases turn a constant-prefix
+        # LIKE into the same range scan where the index order allows it.
+        # Paths are digits and '/', never LIKE wildcards
+        return (
+            (Comment.article_id == comment.article_id) &
+            (Comment.path > comment.path) &
+            Comment.path.like(comment.path + '%')
+        )
+    
+    @staticmethod
+    def backfill_thread_positions(db, Comment, batch_size=1000):
+        """Fill depth and path for comments written before they were stored
+        
+        Works top-down: roots first, then any comment whose parent already
+        has a path, until nothing is left.
+        """
+        updated = 0
+        Parent = db.aliased(Comment)
+        
+        while True:
+            roots = Comment.query.filter(
+                Comment.path.is_(None), Comment.parent_id.is_(None)
+            ).limit(batch_size).all()
+            for comment in roots:
+                CommentThreading.assign_thread_position(comment)
+            
+            replies = db.session.query(Comment, Parent).join(
+                Parent, Comment.parent_id == Parent.id
+            ).filter(
+                Comment.path.is_(None), Parent.path.isnot(None)
+            ).limit(batch_size).all()
+            for comment, parent in replies:
+                CommentThreading.assign_thread_position(comment, parent)
+            
+            if not roots and not replies:
                 break
-            depth += 1
+            
+            updated += len(roots) + len(replies)
+            db.session.commit()
+        
+        return updated
+    
+    # Threaded listing: top-level comments are paginated by keyset, each
+    # followed by its first replies. Sort -> (key columns, descending)
+    ROOT_SORTS = {
+        'newest': (('created_at', 'id'), True),
+        'oldest': (('created_at', 'id'), False),
+        'popular': (('like_count', 'created_at', 'id'), True),
+        'best': (('rank_score', 'id'), True)
+    }
+    REPLY_KEY = ('created_at', 'id')
+    
+    @staticmethod
+    def encode_cursor(values):
+        raw = '|'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor, key):
+        """Decode a cursor for the given key columns; raises ValueError if malformed"""
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        except Exception:
+            raise ValueError('Invalid cursor')
+        if len(parts) != len(key):
+            raise ValueError('Invalid cursor')
+        types = {'created_at': datetime.fromisoformat, 'spam_score': float, 'rank_score': float}
+        try:
+            return [types.get(name, int)(part) for name, part in zip(key, parts)]
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    
+    @staticmethod
+    def keyset_page(query, Comment, key, descending, cursor, limit):
+        """One page of query ordered by key, starting after cursor
+        
+        Returns (rows, next cursor or None).
+        """
+        columns = [getattr(Comment, name) for name in key]
+        if cursor:
+            after = tuple_(*columns)
+            position = tuple_(*CommentThreading.decode_cursor(cursor, key))
+            query = query.filter(after < position if descending else after > position)
+        
+        order = [column.desc() if descending else column.asc() for column in columns]
+        rows = query.order_by(*order).limit(limit + 1).all()
+        
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, CommentThreading.encode_cursor([getattr(rows[-1], name) for name in key])
+    
+    @staticmethod
+    def serialize_node(comment):
+        return {
+            'id': comment.id,
+            'content': comment.content,
+            'author_name': comment.author_name,
+            'author_website': comment.author_website,
+            'created_at': comment.created_at.isoformat(),
+            'like_count': (comment.like_count or 0) + comment_like_buffer.pending(comment.id),
+            'reply_count': comment.reply_count,
+            'parent_id': comment.parent_id,
+            'depth': comment.depth,
+            'replies': []
+        }
+    
+    @staticmethod
+    def fetch_threads(db, Comment, parents, replies_per_node):
+        """Nest the approved replies below parents, at most replies_per_node each
+        
+        All descendants come from one query: a path prefix per parent, with
+        replies ranked within their sibling group so the cap is applied in
+        SQL. Nodes with more replies get a cursor for the replies endpoint.
+        """
+        if not parents:
+            return []
+        nodes = {comment.id: CommentThreading.serialize_node(comment) for comment in parents}
+        
+        ranked = db.session.query(
+            Comment.id.label('id'),
+            func.row_number().over(
+                partition_by=Comment.parent_id,
+                order_by=(Comment.created_at, Comment.id)
+            ).label('position'),
+            func.count().over(partition_by=Comment.parent_id).label('siblings')
+        ).filter(
+            Comment.status == 'approved',
+            or_(*[CommentThreading.subtree_filter(Comment, parent) for parent in parents])
+        ).subquery()
+        
+        rows = db.session.query(Comment, ranked.c.siblings).join(
+            ranked, Comment.id == ranked.c.id
+        ).filter(
+            ranked.c.position <= replies_per_node
+        ).order_by(Comment.depth, Comment.created_at, Comment.id).all()
+        
+        totals = {}
+        last_reply = {}
+        for comment, siblings in rows:
+            parent = nodes.get(comment.parent_id)
+            if parent is None:
+                continue  # Its parent fell outside the cap
+            node = CommentThreading.serialize_node(comment)
+            parent['replies'].append(node)
+            nodes[comment.id] = node
+            totals[comment.parent_id] = siblings
+            last_reply[comment.parent_id] = comment
         
-        return depth
+        for node_id, total in totals.items():
+            node = nodes[node_id]
+            more = total - len(node['replies'])
+            if more > 0:
+                last = last_reply[node_id]
+                node['more_replies'] = more
+                node['replies_cursor'] = CommentThreading.encode_cursor(
+                    [getattr(last, name) for name in CommentThreading.REPLY_KEY]
+                )
+        
+        return [nodes[comment.id] for comment in parents]
+
+# Rendered comment thread cache
+COMMENT_CACHE_MAX_BYTES = int(os.getenv('COMMENT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+COMMENT_CACHE_TTL = int(os.getenv('COMMENT_CACHE_TTL', '60'))  # Bounds like_count staleness
+
+class CommentThreadCache:
+    """Byte-bounded LRU of rendered threaded comment pages
+    
+    Entries are tagged with the article's comment_version and the TTL
+    window they were rendered in. Every change to which comments are
+    visible bumps that column in the same transaction, so an entry rendered
+    before a change is never served, even when the change was made by
+    another worker. invalidate() just frees the space early in the worker
+    that made it.
+    """
+    
+    def __init__(self, max_bytes=COMMENT_CACHE_MAX_BYTES, ttl=COMMENT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (version, body, expires_at)
+        self._article_keys = {}  # article_id -> keys cached for it
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stale = self.evictions = self.invalidations = 0
+    
+    def get(self, key, version):
+        """Cached body for key rendered at version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version or entry[2] < time.monotonic():
+                self._remove(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, body, time.monotonic() + self.ttl)
+            self._article_keys.setdefault(key[0], set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate(self, article_id):
+        """Drop every cached page of an article"""
+        with self._lock:
+            for key in self._article_keys.pop(article_id, ()):
+                version, body, _ = self._entries.pop(key)
+                self._bytes -= len(body)
+            self.invalidations += 1
+    
+    def _remove(self, key):
+        version, body, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+        keys = self._article_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._article_keys[key[0]]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'articles': len(self._article_keys),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+comment_thread_cache = CommentThreadCache()
+
+# "Best" ordering: the Wilson lower bound of likes against weighted reports,
+# plus a term fixed by the posting time. The stored rank_score therefore only
+# changes on likes and reports, yet comparing two scores behaves like
+# exponential decay: a comment RANK_HALF_LIFE older needs twice the
+# (1 + RANK_SCALE * wilson) to rank level with a newer one.
+RANK_Z = 1.96  # 95% confidence
+RANK_REPORT_WEIGHT = 5  # Negative votes per report
+RANK_SCALE = 10
+RANK_HALF_LIFE = 12 * 3600  # Seconds
+RANK_EPOCH = datetime(2024, 1, 1)
+
+def wilson_lower_bound(positive, negative, z=RANK_Z):
+    """Lower bound of the Wilson score interval for positive / (positive + negative)"""
+    n = positive + negative
+    if n <= 0:
+        return 0.0
+    p = positive / n
+    z2 = z * z
+    return (p + z2 / (2 * n) - z * ((p * (1 - p) + z2 / (4 * n)) / n) ** 0.5) / (1 + z2 / n)
+
+def comment_rank(likes, reports, created_at):
+    """Stored rank_score for a comment"""
+    wilson = wilson_lower_bound(max(likes or 0, 0), RANK_REPORT_WEIGHT * max(reports or 0, 0))
+    age = ((created_at or datetime.utcnow()) - RANK_EPOCH).total_seconds()
+    return math.log2(1 + RANK_SCALE * wilson) + age / RANK_HALF_LIFE
+
+# Comment likes: a ledger row per (comment, liker) makes likes idempotent,
+# while like_count increments are buffered and written in batches
+LIKE_FLUSH_INTERVAL = float(os.getenv('LIKE_FLUSH_INTERVAL', '2'))  # Seconds
+LIKE_FLUSH_BATCH = 500  # Pending comments that trigger an immediate flush
+
+def define_like_ledger(db):
+    """comment_likes table; the unique constraint rejects duplicate likes"""
+    existing = db.metadata.tables.get('comment_likes')
+    if existing is not None:
+        return existing
+    return db.Table(
+        'comment_likes',
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('comment_id', db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'), nullable=False),
+        db.Column('liker', db.String(64), nullable=False),  # user:<id> or fp:<digest>
+        db.Column('created_at', db.DateTime, default=datetime.utcnow),
+        db.UniqueConstraint('comment_id', 'liker', name='uq_comment_likes_comment_liker')
+    )
+
+def liker_key(user_id=None):
+    """Ledger key for the current liker: the user, or a guest fingerprint"""
+    if user_id:
+        return f"user:{user_id}"
+    fingerprint = f"{request.remote_addr}|{request.headers.get('User-Agent', '')}"
+    return "fp:" + hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:40]
+
+class LikeCounterBuffer:
+    """Pending like_count deltas, flushed as one batched UPDATE
+    
+    Deltas live in this worker until flushed, so reads add pending() to
+    the stored count. A failed flush puts its deltas back.
+    """
+    
+    def __init__(self, interval=LIKE_FLUSH_INTERVAL, batch=LIKE_FLUSH_BATCH):
+        self.interval = interval
+        self.batch = batch
+        self._deltas = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._app = self._db = self._Comment = None
+        self.flushes = self.rows_written = 0
+    
+    def start(self, app, db, Comment):
+        """Bind to the app and start the background flusher"""
+        self._app, self._db, self._Comment = app, db, Comment
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='comment-like-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+    
+    def add(self, comment_id, delta):
+        with self._lock:
+            self._deltas[comment_id] = self._deltas.get(comment_id, 0) + delta
+            full = len(self._deltas) >= self.batch
+        if full:
+            self.flush()
+    
+    def pending(self, comment_id):
+        with self._lock:
+            return self._deltas.get(comment_id, 0) + self._in_flight.get(comment_id, 0)
+    
+    def flush(self):
+        """Write pending deltas; returns the number of comments updated"""
+        if self._app is None:
+            return 0
+        
+        with self._flush_lock:
+            with self._lock:
+                deltas = {comment_id: delta for comment_id, delta in self._deltas.items() if delta}
+                self._deltas = {}
+                self._in_flight = deltas
+            if not deltas:
+                return 0
+            
+            comments = self._Comment.__table__
+            statement = comments.update().where(
+                comments.c.id == bindparam('comment_id')
+            ).values(like_count=func.coalesce(comments.c.like_count, 0) + bindparam('delta'))
+            rank_statement = comments.update().where(
+                comments.c.id == bindparam('comment_id')
+            ).values(rank_score=bindparam('rank'))
+            
+            try:
+                with self._app.app_context():
+                    with self._db.engine.begin() as connection:
+                        # Sorted so concurrent flushes lock rows in the same order
+                        connection.execute(statement, [
+                            {'comment_id': comment_id, 'delta': delta}
+                            for comment_id, delta in sorted(deltas.items())
+                        ])
+                        # Re-rank from the counts just written (the rows stay locked until commit)
+                        rows = connection.execute(
+                            select(comments.c.id, comments.c.like_count, comments.c.report_count, comments.c.created_at)
+                            .where(comments.c.id.in_(list(deltas)))
+                        ).all()
+                        connection.execute(rank_statement, [
+                            {'comment_id': row.id, 'rank': comment_rank(row.like_count, row.report_count, row.created_at)}
+                            for row in rows
+                        ])
+            except Exception:
+                with self._lock:
+                    for comment_id, delta in deltas.items():
+                        self._deltas[comment_id] = self._deltas.get(comment_id, 0) + delta
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+            
+            self.flushes += 1
+            self.rows_written += len(deltas)
+            return len(deltas)
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Comment like flush failed, will retry: {e}")
+
+comment_like_buffer = LikeCounterBuffer()
 
 # Comment notification system
 class CommentNotifications:
+    """Queue comment notifications; comment_notifications workers deliver them in digests"""
+    
+    @staticmethod
+    def _item(article, comment):
+        return {
+            'comment_id': comment.id,
+            'article_id': article.id if article else comment.article_id,
+            'article_title': article.title if article else None,
+            'author_name': comment.author_name,
+            # Plain text for the digest's text part; EmailSender escapes it for the HTML part
+            'excerpt': html.unescape(re.sub(r'<[^>]+>', '', comment.content or ''))[:200]
+        }
+    
     @staticmethod
     def notify_article_author(article, comment):
         """Notify article author of new comment"""
-        # TODO: Implement email notification
-        print(f"Notifying {article.author.email} of new comment on '{article.title}'")
+        if article.author and article.author.email:
+            comment_outbox.enqueue(article.author.email, 'article_author',
+                                   CommentNotifications._item(article, comment))
     
     @staticmethod
     def notify_comment_replies(parent_comment, reply):
         """Notify parent comment author of reply"""
         if parent_comment.author_email:
-            # TODO: Implement email notification
-            print(f"Notifying {parent_comment.author_email} of reply to their comment")
+            comment_outbox.enqueue(parent_comment.author_email, 'reply',
+                                   CommentNotifications._item(parent_comment.article, reply))
     
     @staticmethod
     def notify_moderators(comment):
         """Notify moderators of comment requiring review"""
-        # TODO: Implement moderator notification system
-        print(f"Notifying moderators of comment requiring review: {comment.id}")
+        comment_outbox.enqueue(MODERATORS, 'moderation', CommentNotifications._item(comment.article, comment))
+
+# Bulk moderation
+BULK_ACTIONS = ('approved', 'rejected', 'spam', 'hidden', 'delete')
+REPORT_UPHELD_STATUSES = ('rejected', 'spam', 'hidden', 'delete')  # Moderator decisions that confirm reports
+BULK_ACTION_ALIASES = {'approve': 'approved', 'reject': 'rejected', 'hide': 'hidden'}
+BULK_MODERATION_CHUNK = 1000  # Ids per statement
+
+def _id_chunks(ids, size=BULK_MODERATION_CHUNK):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def recount_comment_counts(db, Comment, Article, article_ids, bump_version=False):
+    """Set articles.comment_count to their approved comments, one grouped query per chunk"""
+    comments = Comment.__table__
+    articles = Article.__table__
+    values = {'comment_count': bindparam('total')}
+    if bump_version:
+        values['comment_version'] = func.coalesce(articles.c.comment_version, 0) + 1
+    statement = articles.update().where(articles.c.id == bindparam('article_id')).values(values)
+    
+    for chunk in _id_chunks(article_ids):
+        totals = dict(db.session.execute(
+            select(comments.c.article_id, func.count())
+            .where(comments.c.article_id.in_(chunk), comments.c.status == 'approved')
+            .group_by(comments.c.article_id)
+        ).all())
+        db.session.execute(statement, [
+            {'article_id': article_id, 'total': totals.get(article_id, 0)} for article_id in chunk
+        ])
+
+def recount_reply_counts(db, Comment, parent_ids):
+    """Set comments.reply_count to their approved replies, one grouped query per chunk"""
+    comments = Comment.__table__
+    statement = comments.update().where(comments.c.id == bindparam('comment_id')).values(
+        reply_count=bindparam('total')
+    )
+    
+    for chunk in _id_chunks(parent_ids):
+        totals = dict(db.session.execute(
+            select(comments.c.parent_id, func.count())
+            .where(comments.c.parent_id.in_(chunk), comments.c.status == 'approved')
+            .group_by(comments.c.parent_id)
+        ).all())
+        db.session.execute(statement, [
+            {'comment_id': parent_id, 'total': totals.get(parent_id, 0)} for parent_id in chunk
+        ])
+
+# Moderation search: a (token, comment) row per distinct normalized word lets
+# moderators find comments by text with an index lookup instead of a scan
+SEARCH_TOKEN_PATTERN = re.compile(r'[a-z0-9]{3,40}')
+MAX_SEARCH_TOKENS = 200  # Distinct tokens indexed per comment
+
+def define_comment_tokens(db):
+    """comment_tokens table, keyed by token so a lookup is an index range"""
+    existing = db.metadata.tables.get('comment_tokens')
+    if existing is not None:
+        return existing
+    return db.Table(
+        'comment_tokens',
+        db.Column('token', db.String(40), primary_key=True),
+        db.Column('comment_id', db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'), primary_key=True),
+        db.Index('idx_comment_tokens_comment_id', 'comment_id')  # Backfill checks and deletes
+    )
+
+def search_tokens(text):
+    """Distinct lowercase words of a comment, markup removed"""
+    plain = html.unescape(re.sub(r'<[^>]+>', ' ', text or '')).lower()
+    return list(dict.fromkeys(SEARCH_TOKEN_PATTERN.findall(plain)))[:MAX_SEARCH_TOKENS]
+
+# Moderation queue orderings: name -> [(column, descending)]; 'priority'
+# follows idx_comments_moderation_queue
+MODERATION_SORTS = {
+    'priority': [('spam_score', True), ('report_count', True), ('created_at', False), ('id', False)],
+    'newest': [('created_at', True), ('id', True)]
+}
+MODERATION_EXCERPT_LENGTH = 200
+MAX_MODERATION_PAGE = 100
+
+def keyset_after(columns, descending, values):
+    """Rows after values in an ordering that mixes directions
+    
+    (a, b, c) after (x, y, z) is a after x, or a = x and b after y, or ...
+    """
+    clauses = []
+    for position, (column, desc) in enumerate(zip(columns, descending)):
+        equal = [columns[earlier] == values[earlier] for earlier in range(position)]
+        clauses.append(and_(*equal, column < values[position] if desc else column > values[position]))
+    return or_(*clauses)
+
+# Moderation statuses the spam classifier learns from: status -> is spam
+SPAM_LABELS = {'spam': True, 'approved': False}
+
+# Threaded listing limits
+MAX_THREAD_ROOTS = 50
+MAX_REPLIES_PER_NODE = 20
 
 # Comment API routes
 def create_comment_routes(app, db, Comment, Article, User):
     """Create comment system routes"""
+    like_ledger = define_like_ledger(db)
+    comment_tokens = define_comment_tokens(db)
+    comment_like_buffer.start(app, db, Comment)
+    comment_reputation.start()
+    comment_outbox.start()
     
     @app.route('/api/articles/<int:article_id>/comments', methods=['GET'])
     def get_article_comments(article_id):
@@ -193,11 +988,14 @@ def create_comment_routes(app, db, Comment, Article, User):
         try:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 20, type=int)
-            sort_by = request.args.get('sort', 'newest')  # newest, oldest, popular
+            sort_by = request.args.get('sort', 'newest')  # newest, oldest, popular, best
             
             # Verify article exists
             article = Article.query.get_or_404(article_id)
             
+            if request.args.get('mode') == 'threaded':
+                return get_threaded_comments(article, sort_by)
+            
             # Build query
             query = Comment.query.filter_by(
                 article_id=article_id,
@@ -209,6 +1007,8 @@ def create_comment_routes(app, db, Comment, Article, User):
                 query = query.order_by(Comment.created_at.asc())
             elif sort_by == 'popular':
                 query = query.order_by(Comment.like_count.desc(), Comment.created_at.desc())
+            elif sort_by == 'best':
+                query = query.order_by(Comment.rank_score.desc(), Comment.id.desc())
             else:  # newest
                 query = query.order_by(Comment.created_at.desc())
             
@@ -229,7 +1029,7 @@ def create_comment_routes(app, db, Comment, Article, User):
                         'author_name': comment.author_name,
                         'author_website': comment.author_website,
                         'created_at': comment.created_at.isoformat(),
-                        'like_count': comment.like_count,
+                        'like_count': (comment.like_count or 0) + comment_like_buffer.pending(comment.id),
                         'reply_count': comment.reply_count,
                         'parent_id': comment.parent_id,
                         'depth': CommentThreading.get_comment_depth(comment),
@@ -254,6 +1054,188 @@ def create_comment_routes(app, db, Comment, Article, User):
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    def get_threaded_comments(article, sort_by):
+        """Top-level comments by keyset page, each with its first replies nested
+        
+        Pages are served from comment_thread_cache and carry a weak ETag of
+        the article's comment_version and the current COMMENT_CACHE_TTL
+        window, so unchanged threads revalidate with a 304 and no rendering.
+        The window is wall-clock based, so every worker agrees on it, and a
+        page (and its like counts) is never reused past the window it was
+        rendered in.
+        """
+        if sort_by not in CommentThreading.ROOT_SORTS:
+            return jsonify({'success': False, 'error': f'Invalid sort: {sort_by}'}), 400
+        
+        limit = min(max(request.args.get('per_page', 20, type=int), 1), MAX_THREAD_ROOTS)
+        replies_per_node = min(max(request.args.get('replies', 3, type=int), 0), MAX_REPLIES_PER_NODE)
+        cursor = request.args.get('cursor')
+        key, descending = CommentThreading.ROOT_SORTS[sort_by]
+        
+        version = article.comment_version or 0
+        window = int(time.time() // comment_thread_cache.ttl)
+        etag = f"{article.id}.{version}.{window}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        cache_key = (article.id, sort_by, cursor, limit, replies_per_node)
+        body = comment_thread_cache.get(cache_key, (version, window))
+        if body is None:
+            query = Comment.query.filter(
+                Comment.article_id == article.id,
+                Comment.status == 'approved',
+                Comment.parent_id.is_(None)
+            )
+            try:
+                roots, next_cursor = CommentThreading.keyset_page(
+                    query, Comment, key, descending, cursor, limit
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            body = json.dumps({
+                'success': True,
+                'data': {
+                    'comments': CommentThreading.fetch_threads(db, Comment, roots, replies_per_node),
+                    'cursor': next_cursor,
+                    'has_more': next_cursor is not None,
+                    'article': {
+                        'id': article.id,
+                        'title': article.title,
+                        'comment_count': article.comment_count
+                    }
+                }
+            }, separators=(',', ':')).encode('utf-8')
+            comment_thread_cache.put(cache_key, (version, window), body)
+        
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    def commenter_keys(comment):
+        return reputation_keys(comment.ip_address, comment.author_email, comment.author_id)
+    
+    def admin_denied():
+        """A 403 response unless the caller is an admin, else None"""
+        # Checked against the user row, so a demoted admin's token stops working within the cache TTL
+        user = identity_cache.get(User, get_jwt_identity(), get_jwt())
+        if user is None or user.role != 'admin':
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return None
+    
+    def upholds_reports(report_count, old_status, moderated_at, new_status):
+        """Whether a moderator decision confirms a reported comment was bad
+        
+        Anonymous reports are not deduplicated, so they only reach the
+        commenter's reputation (once per comment) when a moderator removes it.
+        """
+        if not report_count or new_status not in REPORT_UPHELD_STATUSES:
+            return False
+        return not (moderated_at and old_status in REPORT_UPHELD_STATUSES)
+    
+    def moderation_example(comment, old_status, new_status):
+        """Classifier update for a moderation decision (call before changing status)
+        
+        Approved comments teach ham and spam teaches spam. If a moderator
+        reverses an earlier decision, that decision is unlearned first.
+        """
+        features = comment_features(comment.content, comment.author_email)
+        examples = []
+        if comment.moderated_at and old_status in SPAM_LABELS and old_status != new_status:
+            examples.append((features, SPAM_LABELS[old_status], -1))
+        if new_status in SPAM_LABELS and (old_status != new_status or not comment.moderated_at):
+            examples.append((features, SPAM_LABELS[new_status], 1))
+        return examples
+    
+    def learn_from_moderation(decisions):
+        """Train the spam classifier after the moderation commit succeeded"""
+        try:
+            spam_classifier.learn([example for examples in decisions for example in examples])
+        except Exception as e:
+            print(f"⚠️ Spam classifier update failed: {e}")
+    
+    def mark_threads_changed(*articles):
+        """Bump comment_version for articles whose visible comments changed
+        
+        Call before commit; pass the same articles to drop_cached_threads()
+        once the commit succeeds.
+        """
+        for article in articles:
+            # Incremented in SQL so concurrent writers never reuse a version
+            article.comment_version = func.coalesce(Article.comment_version, 0) + 1
+    
+    def drop_cached_threads(*articles):
+        for article in articles:
+            comment_thread_cache.invalidate(article.id)
+    
+    @app.route('/api/articles/<int:article_id>/comments/stream', methods=['GET'])
+    def stream_comments(article_id):
+        """Server-Sent Events: newly approved comments and like counts
+        
+        Events: comment (a new comment node), likes ({id, like_count}),
+        removed ({id}) and reset (refetch the listing). Reconnecting clients
+        send Last-Event-ID (or ?last_event_id=) to replay what they missed.
+        A 503 means live updates are off here: poll the listing instead.
+        """
+        try:
+            if not comment_stream.available():
+                return jsonify({'success': False, 'error': 'Live updates are unavailable, poll instead'}), 503
+            
+            if not db.session.query(Article.id).filter_by(id=article_id).first():
+                return jsonify({'success': False, 'error': 'Article not found'}), 404
+            db.session.remove()  # Don't hold a connection for the life of the stream
+            
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            frames = comment_stream.stream(article_id, last_event_id)
+            if frames is None:
+                return jsonify({'success': False, 'error': 'Too many live subscribers, poll instead'}), 503
+            
+            return Response(frames, mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+            })
+            
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    @app.route('/api/comments/<int:comment_id>/replies', methods=['GET'])
+    def get_comment_replies(comment_id):
+        """Load more replies to a comment, following a replies_cursor"""
+        try:
+            parent = Comment.query.get_or_404(comment_id)
+            if parent.status != 'approved':
+                return jsonify({'success': False, 'error': 'Comment not found'}), 404
+            
+            limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_THREAD_ROOTS)
+            replies_per_node = min(max(request.args.get('replies', 3, type=int), 0), MAX_REPLIES_PER_NODE)
+            
+            query = Comment.query.filter(
+                Comment.parent_id == parent.id,
+                Comment.status == 'approved'
+            )
+            try:
+                replies, cursor = CommentThreading.keyset_page(
+                    query, Comment, CommentThreading.REPLY_KEY, False, request.args.get('cursor'), limit
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'parent_id': parent.id,
+                    'replies': CommentThreading.fetch_threads(db, Comment, replies, replies_per_node),
+                    'cursor': cursor,
+                    'has_more': cursor is not None
+                }
+            })
+            
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
     @app.route('/api/articles/<int:article_id>/comments', methods=['POST'])
     def create_comment(article_id):
         """Create a new comment"""
@@ -273,7 +1255,7 @@ def create_comment_routes(app, db, Comment, Article, User):
                     from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
                     verify_jwt_in_request()
                     user_id = get_jwt_identity()
-                    user = User.query.get(user_id)
+                    user = identity_cache.get(User, user_id, get_jwt())
                     if user:
                         author_name = f"{user.first_name} {user.last_name}".strip()
                         author_email = user.email
@@ -283,6 +1265,12 @@ def create_comment_routes(app, db, Comment, Article, User):
             # Verify article exists
             article = Article.query.get_or_404(article_id)
             
+            # Throttle commenters posting too fast
+            reputation_key_list = reputation_keys(request.remote_addr, author_email, user_id)
+            reputation = comment_reputation.assess(reputation_key_list)
+            if reputation['throttled']:
+                return jsonify({'success': False, 'error': 'You are commenting too quickly, please try again later'}), 429
+            
             # Validate comment data
             validation_errors = CommentValidator.validate_comment(
                 content, author_name, author_email, author_website
@@ -290,11 +1278,26 @@ def create_comment_routes(app, db, Comment, Article, User):
             if validation_errors:
                 return jsonify({'success': False, 'error': validation_errors}), 400
             
-            # Sanitize content
-            clean_content = CommentValidator.sanitize_content(content)
-            
-            # Spam detection
-            spam_check = CommentValidator.detect_spam(clean_content, author_email, author_website)
+            # Near-duplicate flood check, before the expensive sanitizer
+            flood = comment_fingerprints.check_and_add(content, article_id, request.remote_addr)
+            if flood['verdict']:
+                # Held copies skip bleach and scoring; escaping keeps them inert
+                clean_content = html.escape(content)
+                spam_check = {
+                    'is_spam': flood['verdict'] == 'spam',
+                    'is_suspicious': True,
+                    'spam_score': 5 if flood['verdict'] == 'spam' else 3,
+                    'reasons': [f"Near-duplicate of {flood['matches']} recent comments"]
+                }
+            else:
+                # Sanitize content
+                clean_content = CommentValidator.sanitize_content(content)
+                
+                # Spam detection
+                spam_check = CommentValidator.detect_spam(clean_content, author_email, author_website, reputation)
+                spam_check = CommentValidator.apply_classifier(
+                    spam_check, spam_classifier.probability(clean_content, author_email)
+                )
             
             # Determine initial status
             if spam_check['is_spam']:
@@ -310,10 +1313,17 @@ def create_comment_routes(app, db, Comment, Article, User):
                 if not parent_comment or parent_comment.article_id != article_id:
                     return jsonify({'success': False, 'error': 'Invalid parent comment'}), 400
                 
-                # Check nesting depth
-                if CommentThreading.get_comment_depth(parent_comment) >= 5:
+                # Check nesting depth (a legacy parent's depth is only known once it has a path)
+                if parent_comment.path is None:
+                    CommentThreading.assign_thread_position(parent_comment, parent_comment.parent)
+                if CommentThreading.get_comment_depth(parent_comment) >= CommentThreading.MAX_DEPTH:
                     return jsonify({'success': False, 'error': 'Maximum reply depth reached'}), 400
             
+            # Only accepted submissions count towards the commenter's reputation
+            comment_reputation.record(reputation_key_list, 'posts')
+            if status == 'spam':
+                comment_reputation.record(reputation_key_list, 'spam')
+            
             # Create comment
             comment = Comment(
                 content=clean_content,
@@ -331,6 +1341,16 @@ def create_comment_routes(app, db, Comment, Article, User):
             
             db.session.add(comment)
             
+            # Store depth and path now that the id is known
+            db.session.flush()
+            CommentThreading.assign_thread_position(comment, parent_comment if parent_id else None)
+            comment.rank_score = comment_rank(0, 0, comment.created_at)
+            tokens = search_tokens(comment.content)
+            if tokens:
+                db.session.execute(comment_tokens.insert(), [
+                    {'token': token, 'comment_id': comment.id} for token in tokens
+                ])
+            
             # Update article comment count if approved
             if status == 'approved':
                 article.comment_count += 1
@@ -338,8 +1358,13 @@ def create_comment_routes(app, db, Comment, Article, User):
                 # Update parent comment reply count
                 if parent_id:
                     parent_comment.reply_count += 1
+                
+                mark_threads_changed(article)
             
             db.session.commit()
+            if status == 'approved':
+                drop_cached_threads(article)
+                comment_stream.publish(article.id, 'comment', CommentThreading.serialize_node(comment))
             
             # Send notifications
             if status == 'approved':
@@ -364,24 +1389,53 @@ def create_comment_routes(app, db, Comment, Article, User):
     
     @app.route('/api/comments/<int:comment_id>/like', methods=['POST'])
     def like_comment(comment_id):
-        """Like/unlike a comment"""
+        """Like/unlike a comment, at most one like per user or guest"""
         try:
             comment = Comment.query.get_or_404(comment_id)
+            stored_count = comment.like_count or 0  # Read before commit expires it
+            action = (request.get_json(silent=True) or {}).get('action', 'like')
             
-            # Simple like system (in production, track user likes)
-            action = request.get_json().get('action', 'like')
+            if action not in ('like', 'unlike'):
+                return jsonify({'success': False, 'error': 'Invalid action'}), 400
+            
+            user_id = None
+            if request.headers.get('Authorization'):
+                try:
+                    verify_jwt_in_request()
+                    user_id = get_jwt_identity()
+                except:
+                    pass  # Not authenticated, count as guest
+            liker = liker_key(user_id)
             
             if action == 'like':
-                comment.like_count += 1
-            elif action == 'unlike' and comment.like_count > 0:
-                comment.like_count -= 1
+                try:
+                    db.session.execute(like_ledger.insert().values(
+                        comment_id=comment_id, liker=liker, created_at=datetime.utcnow()
+                    ))
+                    db.session.commit()
+                    comment_like_buffer.add(comment_id, 1)
+                except IntegrityError:
+                    db.session.rollback()  # Already liked
+                liked = True
+            else:
+                removed = db.session.execute(like_ledger.delete().where(
+                    (like_ledger.c.comment_id == comment_id) & (like_ledger.c.liker == liker)
+                )).rowcount
+                db.session.commit()
+                if removed:
+                    comment_like_buffer.add(comment_id, -1)
+                liked = False
             
-            db.session.commit()
+            like_count = stored_count + comment_like_buffer.pending(comment_id)
+            if comment.status == 'approved':
+                comment_stream.publish(comment.article_id, 'likes', {'id': comment_id, 'like_count': like_count},
+                                       key=('likes', comment_id))
             
             return jsonify({
                 'success': True,
                 'data': {
-                    'like_count': comment.like_count
+                    'like_count': like_count,
+                    'liked': liked
                 }
             })
             
@@ -400,12 +1454,22 @@ def create_comment_routes(app, db, Comment, Article, User):
             # Update comment with report
             comment.report_count += 1
             comment.reported_at = datetime.utcnow()
+            comment.rank_score = comment_rank(
+                (comment.like_count or 0) + comment_like_buffer.pending(comment.id),
+                comment.report_count, comment.created_at
+            )
             
             # Auto-hide if too many reports
+            hidden = comment.report_count >= 5 and comment.status == 'approved'
             if comment.report_count >= 5:
                 comment.status = 'hidden'
+            if hidden:
+                mark_threads_changed(comment.article)
             
             db.session.commit()
+            if hidden:
+                drop_cached_threads(comment.article)
+                comment_stream.publish(comment.article_id, 'removed', {'id': comment.id})
             
             # Notify moderators
             CommentNotifications.notify_moderators(comment)
@@ -423,45 +1487,101 @@ def create_comment_routes(app, db, Comment, Article, User):
     @app.route('/api/admin/comments', methods=['GET'])
     @jwt_required()
     def get_admin_comments():
-        """Get comments for admin moderation"""
+        """Moderation queue and search
+        
+        ?status= with the default sort=priority walks idx_comments_moderation_queue
+        (highest spam score, then most reported, then oldest). ip=, email= and
+        q= (all words must appear) narrow the list through their own indexes;
+        sort=newest orders by created_at. Pages follow ?cursor= from the
+        previous response.
+        """
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
+            per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_MODERATION_PAGE)
             status_filter = request.args.get('status', '')
+            ip_address = request.args.get('ip', '').strip()
+            email = request.args.get('email', '').strip().lower()
+            words = search_tokens(request.args.get('q', ''))
+            sort_by = request.args.get('sort') or ('priority' if status_filter else 'newest')
+            cursor = request.args.get('cursor')
+            
+            if sort_by not in MODERATION_SORTS:
+                return jsonify({'success': False, 'error': 'Invalid sort'}), 400
+            if request.args.get('q', '').strip() and not words:
+                return jsonify({'success': False, 'error': 'Search words need at least 3 letters or digits'}), 400
+            
+            key = [name for name, _ in MODERATION_SORTS[sort_by]]
+            columns = [getattr(Comment, name) for name in key]
+            descending = [desc for _, desc in MODERATION_SORTS[sort_by]]
             
-            query = Comment.query
+            query = db.session.query(
+                Comment.id,
+                func.substr(Comment.content, 1, MODERATION_EXCERPT_LENGTH).label('excerpt'),
+                (func.length(Comment.content) > MODERATION_EXCERPT_LENGTH).label('truncated'),
+                Comment.author_name,
+                Comment.author_email,
+                Comment.ip_address,
+                Comment.status,
+                Comment.spam_score,
+                Comment.report_count,
+                Comment.created_at,
+                Article.id.label('article_id'),
+                Article.title.label('article_title')
+            ).join(Article, Article.id == Comment.article_id)
             
             if status_filter:
-                query = query.filter_by(status=status_filter)
+                query = query.filter(Comment.status == status_filter)
+            if ip_address:
+                query = query.filter(Comment.ip_address == ip_address)
+            if email:
+                query = query.filter(func.lower(Comment.author_email) == email)
+            if words:
+                matching = select(comment_tokens.c.comment_id).where(
+                    comment_tokens.c.token.in_(words)
+                ).group_by(comment_tokens.c.comment_id).having(
+                    func.count(comment_tokens.c.token) == len(words)
+                )
+                query = query.filter(Comment.id.in_(matching))
             
-            comments = query.order_by(Comment.created_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
+            if cursor:
+                try:
+                    values = CommentThreading.decode_cursor(cursor, key)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
+                query = query.filter(keyset_after(columns, descending, values))
+            
+            order = [column.desc() if desc else column.asc() for column, desc in zip(columns, descending)]
+            rows = query.order_by(*order).limit(per_page + 1).all()
+            next_cursor = None
+            if len(rows) > per_page:
+                rows = rows[:per_page]
+                # NULL scores (rows written outside the ORM) page as zero
+                next_cursor = CommentThreading.encode_cursor([
+                    getattr(rows[-1], name) if getattr(rows[-1], name) is not None else 0 for name in key
+                ])
             
             return jsonify({
                 'success': True,
                 'data': {
                     'comments': [{
-                        'id': comment.id,
-                        'content': comment.content[:200] + '...' if len(comment.content) > 200 else comment.content,
-                        'author_name': comment.author_name,
-                        'author_email': comment.author_email,
-                        'status': comment.status,
-                        'spam_score': comment.spam_score,
-                        'report_count': comment.report_count,
+                        'id': row.id,
+                        'content': row.excerpt + '...' if row.truncated else row.excerpt,
+                        'author_name': row.author_name,
+                        'author_email': row.author_email,
+                        'ip_address': row.ip_address,
+                        'status': row.status,
+                        'spam_score': row.spam_score,
+                        'report_count': row.report_count,
                         'article': {
-                            'id': comment.article.id,
-                            'title': comment.article.title
+                            'id': row.article_id,
+                            'title': row.article_title
                         },
-                        'created_at': comment.created_at.isoformat()
-                    } for comment in comments.items],
+                        'created_at': row.created_at.isoformat()
+                    } for row in rows],
                     'pagination': {
-                        'page': comments.page,
-                        'pages': comments.pages,
-                        'per_page': comments.per_page,
-                        'total': comments.total,
-                        'has_next': comments.has_next,
-                        'has_prev': comments.has_prev
+                        'per_page': per_page,
+                        'sort': sort_by,
+                        'next_cursor': next_cursor,
+                        'has_next': next_cursor is not None
                     }
                 }
             })
@@ -483,6 +1603,11 @@ def create_comment_routes(app, db, Comment, Article, User):
                 return jsonify({'success': False, 'error': 'Invalid status'}), 400
             
             old_status = comment.status
+            decision = moderation_example(comment, old_status, new_status)
+            if new_status == 'spam' and old_status != 'spam':
+                comment_reputation.record(commenter_keys(comment), 'spam')
+            if upholds_reports(comment.report_count, old_status, comment.moderated_at, new_status):
+                comment_reputation.record(commenter_keys(comment), 'reports')
             comment.status = new_status
             comment.moderated_at = datetime.utcnow()
             comment.moderated_by = get_jwt_identity()
@@ -494,7 +1619,18 @@ def create_comment_routes(app, db, Comment, Article, User):
             elif old_status == 'approved' and new_status != 'approved':
                 comment.article.comment_count = max(0, comment.article.comment_count - 1)
             
+            changed = (old_status == 'approved') != (new_status == 'approved')
+            if changed:
+                mark_threads_changed(comment.article)
+            
             db.session.commit()
+            if changed:
+                drop_cached_threads(comment.article)
+                if new_status == 'approved':
+                    comment_stream.publish(comment.article_id, 'comment', CommentThreading.serialize_node(comment))
+                else:
+                    comment_stream.publish(comment.article_id, 'removed', {'id': comment.id})
+            learn_from_moderation([decision])
             
             return jsonify({
                 'success': True,
@@ -508,56 +1644,322 @@ def create_comment_routes(app, db, Comment, Article, User):
     @app.route('/api/admin/comments/bulk-moderate', methods=['POST'])
     @jwt_required()
     def bulk_moderate_comments():
-        """Bulk moderate multiple comments"""
+        """Bulk moderate multiple comments
+        
+        Runs as set-based UPDATE/DELETE statements over chunks of ids in one
+        transaction, then recounts the affected articles and parents with
+        grouped queries.
+        """
         try:
             data = request.get_json()
             comment_ids = data.get('comment_ids', [])
-            action = data.get('action')  # approve, reject, spam, delete
+            action = data.get('action')  # approve, reject, spam, hide, delete
+            action = BULK_ACTION_ALIASES.get(action, action)
             
             if not comment_ids or not action:
                 return jsonify({'success': False, 'error': 'Comment IDs and action are required'}), 400
+            if action not in BULK_ACTIONS:
+                return jsonify({'success': False, 'error': 'Invalid action'}), 400
             
-            comments = Comment.query.filter(Comment.id.in_(comment_ids)).all()
+            try:
+                comment_ids = sorted({int(comment_id) for comment_id in comment_ids})
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Comment IDs must be integers'}), 400
             
-            success_count = 0
-            for comment in comments:
-                try:
-                    if action == 'delete':
-                        # Update article comment count
-                        if comment.status == 'approved':
-                            comment.article.comment_count = max(0, comment.article.comment_count - 1)
-                        db.session.delete(comment)
-                    else:
-                        old_status = comment.status
-                        comment.status = action
-                        comment.moderated_at = datetime.utcnow()
-                        comment.moderated_by = get_jwt_identity()
-                        
-                        # Update article comment count
-                        if old_status != 'approved' and action == 'approved':
-                            comment.article.comment_count += 1
-                        elif old_status == 'approved' and action != 'approved':
-                            comment.article.comment_count = max(0, comment.article.comment_count - 1)
-                    
-                    success_count += 1
-                except:
-                    continue
+            comments = Comment.__table__
+            moderator_id = get_jwt_identity()
+            learns = action in SPAM_LABELS
+            upholds = action in REPORT_UPHELD_STATUSES
+            columns = [comments.c.id, comments.c.article_id, comments.c.parent_id, comments.c.status]
+            if learns or action == 'spam' or upholds:
+                columns += [comments.c.content, comments.c.author_email, comments.c.author_id,
+                            comments.c.ip_address, comments.c.moderated_at, comments.c.report_count]
+            if action == 'delete':
+                columns += [comments.c.path, comments.c.depth]
+            
+            started = time.perf_counter()
+            processed = 0
+            visible_articles = set()
+            affected_parents = set()
+            decisions = []
+            chunks = []
             
+            for start in range(0, len(comment_ids), BULK_MODERATION_CHUNK):
+                chunk_started = time.perf_counter()
+                chunk = comment_ids[start:start + BULK_MODERATION_CHUNK]
+                rows = db.session.execute(select(*columns).where(comments.c.id.in_(chunk))).all()
+                found = [row.id for row in rows]
+                
+                for row in rows:
+                    # Only approved comments are visible and counted
+                    if row.status == 'approved' or action == 'approved':
+                        visible_articles.add(row.article_id)
+                        if row.parent_id:
+                            affected_parents.add(row.parent_id)
+                    if learns:
+                        decisions.append(moderation_example(row, row.status, action))
+                    if action == 'spam' and row.status != 'spam':
+                        comment_reputation.record(commenter_keys(row), 'spam')
+                    if upholds and upholds_reports(row.report_count, row.status, row.moderated_at, action):
+                        comment_reputation.record(commenter_keys(row), 'reports')
+                
+                if found and action == 'delete':
+                    # Replies to deleted comments become top-level, as the ORM delete did,
+                    # and their subtrees drop the deleted prefix from path and depth.
+                    # Deepest first, so a subtree already moved out of a deleted
+                    # ancestor's range is not moved twice
+                    promoted = db.session.execute(
+                        select(comments.c.parent_id, comments.c.article_id, comments.c.status)
+                        .where(comments.c.parent_id.in_(found))
+                    ).all()
+                    with_replies = {reply.parent_id for reply in promoted}
+                    # An approved reply moving to the top level changes the visible thread
+                    # even when the deleted parent itself was never shown
+                    visible_articles.update(reply.article_id for reply in promoted if reply.status == 'approved')
+                    for row in sorted(rows, key=lambda row: row.depth or 0, reverse=True):
+                        if row.id in with_replies and row.path:
+                            db.session.execute(
+                                comments.update().where(CommentThreading.subtree_filter(Comment, row)).values(
+                                    path=func.substr(comments.c.path, len(row.path) + 1),
+                                    depth=comments.c.depth - (row.depth + 1)
+                                )
+                            )
+                    db.session.execute(
+                        comments.update().where(comments.c.parent_id.in_(found)).values(parent_id=None)
+                    )
+                    db.session.execute(like_ledger.delete().where(like_ledger.c.comment_id.in_(found)))
+                    db.session.execute(comment_tokens.delete().where(comment_tokens.c.comment_id.in_(found)))
+                    db.session.execute(comments.delete().where(comments.c.id.in_(found)))
+                elif found:
+                    db.session.execute(
+                        comments.update().where(comments.c.id.in_(found)).values(
+                            status=action,
+                            moderated_at=datetime.utcnow(),
+                            moderated_by=moderator_id
+                        )
+                    )
+                
+                processed += len(found)
+                chunks.append({
+                    'chunk': len(chunks) + 1,
+                    'requested': len(chunk),
+                    'processed': len(found),
+                    'elapsed_ms': round((time.perf_counter() - chunk_started) * 1000, 1)
+                })
+            
+            recount_comment_counts(db, Comment, Article, visible_articles, bump_version=True)
+            recount_reply_counts(db, Comment, affected_parents)
             db.session.commit()
             
+            for article_id in visible_articles:
+                comment_thread_cache.invalidate(article_id)
+                comment_stream.publish(article_id, 'reset', {})  # Too many changes to send one by one
+            learn_from_moderation(decisions)
+            
             return jsonify({
                 'success': True,
-                'message': f'Successfully processed {success_count} comments'
+                'message': f'Successfully processed {processed} comments',
+                'data': {
+                    'processed': processed,
+                    'not_found': len(comment_ids) - processed,
+                    'articles_recounted': len(visible_articles),
+                    'parents_recounted': len(affected_parents),
+                    'chunks': chunks,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+                }
             })
             
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
+    
+    @app.route('/api/admin/comments/cache', methods=['GET'])
+    @jwt_required()
+    def get_comment_cache_stats():
+        """Comment thread cache metrics"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        
+        return jsonify({
+            'success': True,
+            'data': dict(
+                comment_thread_cache.stats(),
+                stream=comment_stream.stats(),
+                sanitize=dict(CommentValidator.sanitize_stats)
+            )
+        })
+    
+    @app.route('/api/admin/comments/reputation', methods=['GET'])
+    @jwt_required()
+    def get_commenter_reputation():
+        """Decayed behaviour counters for an IP, email and/or user"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        
+        keys = reputation_keys(
+            request.args.get('ip'), request.args.get('email'), request.args.get('user_id')
+        )
+        if not keys:
+            return jsonify({'success': False, 'error': 'Provide ip, email or user_id'}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'keys': {key: comment_reputation.counters(key) for key in keys},
+                'assessment': comment_reputation.assess(keys),
+                'store': comment_reputation.stats()
+            }
+        })
+    
+    @app.route('/api/admin/comments/notifications', methods=['GET'])
+    @jwt_required()
+    def get_notification_outbox():
+        """Comment notification outbox backlog"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        
+        return jsonify({'success': True, 'data': comment_outbox.stats()})
+    
+    @app.route('/api/admin/comments/notifications/digest-window', methods=['PUT'])
+    @jwt_required()
+    def set_notification_digest_window():
+        """Set (or with seconds null, reset) one recipient's digest window"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        
+        try:
+            data = request.get_json() or {}
+            recipient = data.get('recipient')
+            seconds = data.get('seconds')
+            
+            if not recipient:
+                return jsonify({'success': False, 'error': 'Recipient is required'}), 400
+            if seconds is not None and (not isinstance(seconds, (int, float)) or not 0 <= seconds <= 7 * 86400):
+                return jsonify({'success': False, 'error': 'Seconds must be between 0 and 604800'}), 400
+            
+            comment_outbox.set_digest_window(recipient, seconds)
+            return jsonify({'success': True, 'message': 'Digest window updated'})
+            
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    @app.cli.command('rescore-pending-comments')
+    def rescore_pending_comments():
+        """Re-rank the pending queue with the current spam classifier"""
+        comments = Comment.__table__
+        statement = comments.update().where(
+            comments.c.id == bindparam('comment_id')
+        ).values(spam_score=bindparam('score'))
+        
+        last_id = rescored = 0
+        while True:
+            batch = db.session.query(
+                Comment.id, Comment.content, Comment.author_email, Comment.author_website
+            ).filter(
+                Comment.status == 'pending', Comment.id > last_id
+            ).order_by(Comment.id).limit(1000).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+            
+            probabilities = spam_classifier.batch_probabilities(
+                [comment_features(row.content, row.author_email) for row in batch]
+            )
+            if probabilities is None:
+                print("❌ Spam classifier has not seen enough moderated comments yet")
+                return
+            
+            updates = []
+            for row, probability in zip(batch, probabilities):
+                spam_check = CommentValidator.detect_spam(row.content, row.author_email, row.author_website)
+                spam_check = CommentValidator.apply_classifier(spam_check, float(probability))
+                updates.append({'comment_id': row.id, 'score': spam_check['spam_score']})
+            
+            db.session.execute(statement, updates)
+            db.session.commit()
+            rescored += len(updates)
+            print(f"   {rescored} pending comments rescored")
+        
+        print(f"✅ Rescored {rescored} pending comments")
+    
+    @app.cli.command('index-comment-tokens')
+    def index_comment_tokens():
+        """Build moderation search tokens for comments that have none"""
+        comments = Comment.__table__
+        indexed = 0
+        last_id = 0
+        
+        while True:
+            rows = db.session.execute(
+                select(comments.c.id, comments.c.content)
+                .where(comments.c.id > last_id)
+                .where(~select(comment_tokens.c.comment_id)
+                       .where(comment_tokens.c.comment_id == comments.c.id).exists())
+                .order_by(comments.c.id)
+                .limit(1000)
+            ).all()
+            if not rows:
+                break
+            
+            token_rows = [
+                {'token': token, 'comment_id': comment_id}
+                for comment_id, content in rows
+                for token in search_tokens(content)
+            ]
+            if token_rows:
+                db.session.execute(comment_tokens.insert(), token_rows)
+            db.session.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+        
+        print(f"✅ Indexed search tokens for {indexed} comments")
+    
+    @app.cli.command('rescore-comment-ranks')
+    def rescore_comment_ranks():
+        """Recompute rank_score for every comment (after changing the ranking constants)"""
+        comments = Comment.__table__
+        statement = comments.update().where(
+            comments.c.id == bindparam('comment_id')
+        ).values(rank_score=bindparam('rank'))
+        updated = 0
+        last_id = 0
+        
+        while True:
+            rows = db.session.execute(
+                select(comments.c.id, comments.c.like_count, comments.c.report_count, comments.c.created_at)
+                .where(comments.c.id > last_id)
+                .order_by(comments.c.id)
+                .limit(5000)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(statement, [
+                {'comment_id': row.id, 'rank': comment_rank(row.like_count, row.report_count, row.created_at)}
+                for row in rows
+            ])
+            db.session.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+        
+        print(f"✅ Re-ranked {updated} comments")
+    
+    @app.cli.command('backfill-comment-paths')
+    def backfill_comment_paths():
+        """Store depth and path for comments created before they existed"""
+        updated = CommentThreading.backfill_thread_positions(db, Comment)
+        print(f"✅ Stored thread positions for {updated} comments")
 
 # Database model updates for comments
 def update_comment_model():
     """Updated Comment model with all features"""
     return """
+    # Article also needs a comment_version counter for the thread cache:
+    #     comment_version = db.Column(db.Integer, default=0, nullable=False)
+    
     class Comment(db.Model):
         __tablename__ = 'comments'
         
@@ -574,9 +1976,14 @@ def update_comment_model():
         parent_id = db.Column(db.Integer, db.ForeignKey('comments.id'))
         reply_count = db.Column(db.Integer, default=0)
         
+        # Materialized thread position (see CommentThreading)
+        depth = db.Column(db.Integer, default=0, nullable=False)
+        path = db.Column(db.String(255))
+        
         # Engagement metrics
         like_count = db.Column(db.Integer, default=0)
         report_count = db.Column(db.Integer, default=0)
+        rank_score = db.Column(db.Float, default=0.0, nullable=False)  # See comment_rank()
         
         # Spam detection
         spam_score = db.Column(db.Float, default=0.0)
@@ -605,6 +2012,16 @@ def update_comment_model():
         
         # Self-referential relationship for threading
         replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]))
+        
+        __table_args__ = (
+            db.Index('idx_comments_article_path', 'article_id', 'path'),
+            # sort=best is one range scan
+            db.Index('idx_comments_article_status_rank', article_id, status, rank_score.desc(), id.desc()),
+            # Moderation queue order, and the moderators' IP and email lookups
+            db.Index('idx_comments_moderation_queue', status, spam_score.desc(), report_count.desc(), created_at, id),
+            db.Index('idx_comments_ip_created_at', ip_address, created_at, id),
+            db.Index('idx_comments_author_email_lower', db.func.lower(author_email)),
+        )
     """
 
 if __name__ == "__main__":
@@ -19,6 +19,7 @@ import re
 from jinja2 import Template
 import requests
 import json
+from rate_limiter import rate_limits
 
 # Email configuration
 class EmailConfig:
@@ -438,21 +439,9 @@ class TokenManager:
 class EmailRateLimit:
     """Rate limiting for email sending to prevent abuse"""
     
-    # In-memory storage (use Redis in production)
-    _rate_limits = {}
-    
     @classmethod
     def can_send_email(cls, email, email_type='verification'):
         """Check if email can be sent based on rate limits"""
-        key = f"{email}:{email_type}"
-        now = time.time()
-        
-        # Clean old entries
-        cls._cleanup_old_entries()
-        
-        if key not in cls._rate_limits:
-            cls._rate_limits[key] = []
-        
         # Get rate limit based on email type
         if email_type == 'verification':
             max_emails = EmailConfig.MAX_VERIFICATION_EMAILS_PER_HOUR
@@ -461,28 +450,7 @@ class EmailRateLimit:
         else:
             max_emails = 5  # Default limit
         
-        # Count emails sent in the last hour
-        hour_ago = now - 3600
-        recent_sends = [timestamp for timestamp in cls._rate_limits[key] if timestamp > hour_ago]
-        
-        if len(recent_sends) >= max_emails:
-            return False
-        
-        # Record this send
-        cls._rate_limits[key] = recent_sends + [now]
-        return True
-    
-    @classmethod
-    def _cleanup_old_entries(cls):
-        """Clean up old rate limit entries"""
-        hour_ago = time.time() - 3600
-        for key in list(cls._rate_limits.keys()):
-            cls._rate_limits[key] = [
-                timestamp for timestamp in cls._rate_limits[key] 
-                if timestamp > hour_ago
-            ]
-            if not cls._rate_limits[key]:
-                del cls._rate_limits[key]
+        return rate_limits.is_allowed(f"email:{email.lower()}:{email_type}", max_emails, 3600)
 
 # Main email verification functions
 class EmailVerificationService:
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Authenticated Identity Cache
+For GlobalPerspective News Platform
+
+Protected routes mostly need a few fields of the caller's user row: role
+and active flag for authorization, name and email for display. This keeps
+those fields per process in an LRU keyed by user id, so a request from a
+recently seen user costs no database round trip.
+
+Entries are detached snapshots (UserIdentity), never ORM objects, and
+expire after IDENTITY_CACHE_TTL seconds. Any ORM update or delete of a
+User in this process drops its entry at once. Changes made by other
+processes show up within the TTL, or sooner for a token that disagrees
+with the snapshot: one issued after the snapshot was taken (as happens on
+login after a password change) or carrying a different role claim reloads
+it. Routes that write the user row still load the ORM object.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event
+
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+IDENTITY_CACHE_TTL = 30  # Seconds a snapshot is trusted
+
+IDENTITY_FIELDS = (
+    'id', 'username', 'email', 'role', 'first_name', 'last_name', 'is_active',
+    'bio', 'avatar_url', 'created_at', 'last_login', 'password_changed_at'
+)
+
+class UserIdentity(namedtuple('UserIdentity', IDENTITY_FIELDS)):
+    __slots__ = ()
+    
+    @property
+    def display_name(self):
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
+
+class IdentityCache:
+    """Per-process LRU of user identity snapshots"""
+    
+    def __init__(self, max_entries=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user id -> (loaded_at, UserIdentity)
+        self._lock = threading.Lock()
+        self._watched = set()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def watch(self, User):
+        """Drop cached entries when this process updates or deletes a user"""
+        if User in self._watched:
+            return
+        self._watched.add(User)
+        
+        def user_changed(mapper, connection, target):
+            self.invalidate(target.id)
+        
+        event.listen(User, 'after_update', user_changed)
+        event.listen(User, 'after_delete', user_changed)
+    
+    def get(self, User, user_id, claims=None):
+        """Identity snapshot for user_id, or None if there is no such user
+        
+        claims (the JWT's) stamp the request: a snapshot older than the
+        token's iat, or with another role, is reloaded.
+        """
+        if user_id is None:
+            return None
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                loaded_at, identity = entry
+                if claims is None or (claims.get('iat', 0) < loaded_at and
+                                      claims.get('role', identity.role) == identity.role):
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return identity
+        
+        self.watch(User)
+        user = User.query.get(user_id)
+        self.misses += 1
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        
+        identity = UserIdentity(*(getattr(user, field, None) for field in IDENTITY_FIELDS))
+        with self._lock:
+            self._entries[user_id] = (now, identity)
+            self._entries.move_to_end(user_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return identity
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(int(user_id), None) is not None:
+                self.invalidations += 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations
+            }
+
+identity_cache = IdentityCache()
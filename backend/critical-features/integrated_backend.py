@@ -7,15 +7,21 @@ Core features without external dependencies that cause installation issues
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity, get_jwt
+from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
 import os
 import secrets
 import re
 import time
 import hashlib
-from sqlalchemy import or_, and_, func
+import base64
+import click
+from sqlalchemy import or_, and_, func, event, inspect, select, bindparam
+from sqlalchemy.orm import joinedload, load_only
+from rate_limiter import rate_limits
+from password_hashing import password_hasher, PasswordHashingBusy
+from identity_cache import identity_cache
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -27,6 +33,14 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = secrets.token_urlsafe(32)
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
+# Maximum ids + slugs accepted by /api/articles/batch
+MAX_BATCH_ARTICLES = 50
+
+# Delta sync feed (/api/articles/changes)
+MAX_SYNC_CHANGES = 200
+SYNC_SETTLE_SECONDS = 2  # Skip rows this fresh so in-flight transactions are not jumped
+SYNC_TOMBSTONE_RETENTION = timedelta(days=30)
+
 # Initialize extensions
 db = SQLAlchemy(app)
 cors = CORS(app)
@@ -64,6 +78,9 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     
+    # Denormalized published-article counter (see _adjust_article_counts)
+    article_count = db.Column(db.Integer, default=0, nullable=False)
+    
     # Relationships
     articles = db.relationship('Article', backref='author', lazy=True)
     comments = db.relationship('Comment', foreign_keys='Comment.author_id', backref='user', lazy=True)
@@ -77,6 +94,9 @@ class Category(db.Model):
     description = db.Column(db.Text)
     color = db.Column(db.String(7), default='#c41e3a')
     
+    # Denormalized published-article counter (see _adjust_article_counts)
+    article_count = db.Column(db.Integer, default=0, nullable=False)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -105,6 +125,7 @@ class Article(db.Model):
     # Engagement metrics
     view_count = db.Column(db.Integer, default=0)
     comment_count = db.Column(db.Integer, default=0)
+    comment_version = db.Column(db.Integer, default=0, nullable=False)  # Bumped when visible comments change
     like_count = db.Column(db.Integer, default=0)
     share_count = db.Column(db.Integer, default=0)
     
@@ -123,6 +144,40 @@ class Article(db.Model):
     
     # Relationships
     comments = db.relationship('Comment', backref='article', lazy=True, cascade='all, delete-orphan')
+    
+    # Keyset index for the delta sync feed
+    __table_args__ = (
+        db.Index('idx_articles_updated_at_id', 'updated_at', 'id'),
+    )
+    
+    # Fields clients may request with ?fields=, mapped to the attributes they read
+    API_FIELDS = {
+        'id': ('id',),
+        'title': ('title',),
+        'slug': ('slug',),
+        'excerpt': ('excerpt',),
+        'content': ('content',),
+        'featured_image': ('featured_image',),
+        'featured_image_alt': ('featured_image_alt',),
+        'meta_title': ('meta_title',),
+        'meta_description': ('meta_description',),
+        'tags': ('tags',),
+        'published_at': ('published_at',),
+        'updated_at': ('updated_at',),
+        'author': ('author_id', 'author'),
+        'category': ('category_id', 'category'),
+        'view_count': ('view_count',),
+        'comment_count': ('comment_count',),
+        'like_count': ('like_count',),
+        'share_count': ('share_count',),
+        'is_featured': ('is_featured',),
+        'is_breaking': ('is_breaking',)
+    }
+    SUMMARY_FIELDS = (
+        'id', 'title', 'slug', 'excerpt', 'featured_image', 'published_at', 'author',
+        'category', 'view_count', 'comment_count', 'is_featured', 'is_breaking'
+    )
+    FULL_FIELDS = tuple(API_FIELDS)
 
 class Comment(db.Model):
     __tablename__ = 'comments'
@@ -166,30 +221,324 @@ class Comment(db.Model):
     
     # Self-referential relationship for threading
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]))
+    
+    __table_args__ = (
+        # Approved-comment counts per article and per parent (reconcile-counts)
+        db.Index('idx_comments_article_id_status', 'article_id', 'status'),
+        db.Index('idx_comments_parent_id_status', 'parent_id', 'status'),
+    )
+    
+    # Fields clients may request with ?fields=, mapped to the attributes they read
+    API_FIELDS = {
+        'id': ('id',),
+        'content': ('content',),
+        'author_name': ('author_name', 'author_id', 'user'),
+        'created_at': ('created_at',),
+        'like_count': ('like_count',),
+        'reply_count': ('reply_count',),
+        'parent_id': ('parent_id',)
+    }
+    DEFAULT_FIELDS = tuple(API_FIELDS)
+
+class ArticleTombstone(db.Model):
+    """Deleted article ids, kept so sync clients can drop them"""
+    __tablename__ = 'article_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, nullable=False)  # No FK: the article is gone
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_article_tombstones_deleted_at_article_id', 'deleted_at', 'article_id'),
+    )
+
+# Published-article counters
+# Category.article_count and User.article_count are adjusted inside the same
+# flush that changes an article, so they commit or roll back with it.
+def _adjust_article_counts(connection, category_id, author_id, delta):
+    """Apply a published-article delta to a category and an author"""
+    if category_id is not None:
+        categories = Category.__table__
+        connection.execute(
+            categories.update()
+            .where(categories.c.id == category_id)
+            .values(article_count=categories.c.article_count + delta)
+        )
+    if author_id is not None:
+        users = User.__table__
+        connection.execute(
+            users.update()
+            .where(users.c.id == author_id)
+            .values(article_count=users.c.article_count + delta)
+        )
+
+def _previous_value(target, attr):
+    """Value of an attribute before the pending flush"""
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+@event.listens_for(Article.status, 'set', active_history=True)
+@event.listens_for(Article.category_id, 'set', active_history=True)
+@event.listens_for(Article.author_id, 'set', active_history=True)
+def _track_counted_attribute(target, value, oldvalue, initiator):
+    """Load the old value on assignment so counter deltas can see it"""
+    return value
+
+@event.listens_for(Article, 'after_insert')
+def _article_inserted(mapper, connection, target):
+    if target.status == 'published':
+        _adjust_article_counts(connection, target.category_id, target.author_id, 1)
+
+@event.listens_for(Article, 'after_update')
+def _article_updated(mapper, connection, target):
+    # Most updates (view counts, edits) touch none of the counted attributes
+    state = inspect(target)
+    if not any(state.attrs[attr].history.has_changes() for attr in ('status', 'category_id', 'author_id')):
+        return
+    
+    was_published = _previous_value(target, 'status') == 'published'
+    is_published = target.status == 'published'
+    old_category_id = _previous_value(target, 'category_id')
+    old_author_id = _previous_value(target, 'author_id')
+    
+    if was_published:
+        if (is_published and old_category_id == target.category_id
+                and old_author_id == target.author_id):
+            return
+        _adjust_article_counts(connection, old_category_id, old_author_id, -1)
+    if is_published:
+        _adjust_article_counts(connection, target.category_id, target.author_id, 1)
+
+@event.listens_for(Article, 'before_delete')
+def _article_deleted(mapper, connection, target):
+    if target.status == 'published':
+        _adjust_article_counts(connection, target.category_id, target.author_id, -1)
+
+@event.listens_for(Article, 'after_delete')
+def _record_article_tombstone(mapper, connection, target):
+    connection.execute(
+        ArticleTombstone.__table__.insert().values(
+            article_id=target.id,
+            deleted_at=datetime.utcnow()
+        )
+    )
+
+# Denormalized counters checked by reconcile-counts:
+# name -> (owning model, counter column, foreign key of the counted rows, which rows count)
+RECONCILED_COUNTERS = {
+    'articles.comment_count': (Article, Article.comment_count, Comment.article_id, Comment.status == 'approved'),
+    'comments.reply_count': (Comment, Comment.reply_count, Comment.parent_id, Comment.status == 'approved'),
+    'categories.article_count': (Category, Category.article_count, Article.category_id, Article.status == 'published'),
+    'users.article_count': (User, User.article_count, Article.author_id, Article.status == 'published')
+}
+RECONCILE_BATCH_SIZE = 5000  # Owning rows per batch and transaction
+RECONCILE_SAMPLE_SIZE = 20  # Drifted rows listed per counter
+
+def reconcile_counter(name, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """Recompute one counter in id-range batches and repair rows that drifted
+    
+    Each batch reads batch_size owning rows in id order and counts their rows
+    with one grouped query over that id range, so the work per batch is
+    bounded however large the tables grow. Only changed rows are written,
+    and only if the counter still holds the value that was read: a row the
+    mapper events changed in between is skipped (and counted in 'skipped')
+    rather than overwritten with a count that is already stale.
+    """
+    model, counter, foreign_key, counted = RECONCILED_COUNTERS[name]
+    table = model.__table__
+    statement = table.update().where(
+        table.c.id == bindparam('row_id'), table.c[counter.name] == bindparam('stored')
+    ).values({counter.name: bindparam('actual')})
+    report = {'checked': 0, 'drifted': 0, 'skipped': 0, 'sample': []}
+    last_id = 0
+    
+    while True:
+        rows = db.session.execute(
+            select(model.id, counter).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        first_id, last_id = rows[0][0], rows[-1][0]
+        
+        actual = dict(db.session.execute(
+            select(foreign_key, func.count())
+            .where(foreign_key.between(first_id, last_id), counted)
+            .group_by(foreign_key)
+        ).all())
+        drifted = [
+            (row_id, stored, actual.get(row_id, 0))
+            for row_id, stored in rows
+            if stored != actual.get(row_id, 0)
+        ]
+        
+        if drifted and not dry_run:
+            for row_id, stored, value in drifted:
+                result = db.session.execute(statement, {'row_id': row_id, 'stored': stored, 'actual': value})
+                if not result.rowcount:
+                    report['skipped'] += 1
+        db.session.commit()
+        
+        report['checked'] += len(rows)
+        report['drifted'] += len(drifted)
+        room = RECONCILE_SAMPLE_SIZE - len(report['sample'])
+        report['sample'].extend(
+            {'id': row_id, 'stored': stored, 'actual': value} for row_id, stored, value in drifted[:room]
+        )
+    
+    return report
+
+def reconcile_counters(names=None, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """Reconcile the named counters (all by default); returns a report per counter"""
+    return {
+        name: reconcile_counter(name, batch_size, dry_run)
+        for name in (names or RECONCILED_COUNTERS)
+    }
+
+@app.cli.command('reconcile-counts')
+@click.option('--dry-run', is_flag=True, help="Report drift without writing")
+@click.option('--batch-size', type=int, default=RECONCILE_BATCH_SIZE)
+@click.option('--counter', 'names', multiple=True, type=click.Choice(list(RECONCILED_COUNTERS)))
+def reconcile_counts_command(dry_run, batch_size, names):
+    """Repair denormalized comment, reply and published-article counters"""
+    started = time.perf_counter()
+    reports = reconcile_counters(names, batch_size, dry_run)
+    
+    for name, report in reports.items():
+        verb = 'would be repaired' if dry_run else 'repaired'
+        print(f"{'🔍' if dry_run else '✅'} {name}: {report['drifted']}/{report['checked']} {verb}")
+        for row in report['sample']:
+            print(f"   id {row['id']}: {row['stored']} -> {row['actual']}")
+        if report['drifted'] > len(report['sample']):
+            print(f"   ... and {report['drifted'] - len(report['sample'])} more")
+        if report['skipped']:
+            print(f"   {report['skipped']} changed while checking; left for the next run")
+    print(f"   Finished in {time.perf_counter() - started:.1f}s")
+
+def prune_article_tombstones():
+    """Delete tombstones older than the sync retention window"""
+    cutoff = datetime.utcnow() - SYNC_TOMBSTONE_RETENTION
+    removed = ArticleTombstone.query.filter(ArticleTombstone.deleted_at < cutoff)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+@app.cli.command('prune-tombstones')
+def prune_tombstones_command():
+    """Remove article tombstones past the sync retention window"""
+    removed = prune_article_tombstones()
+    print(f"✅ {removed} tombstone(s) removed")
+
+# Delta sync cursors: opaque (timestamp, id) keyset positions
+def encode_sync_cursor(timestamp, row_id):
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_sync_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(row_id)
+
+# Sparse fieldsets (?fields=)
+def parse_fields(model, default):
+    """Parse the fields query parameter against model.API_FIELDS"""
+    raw = request.args.get('fields', '')
+    if not raw.strip():
+        return list(default), None
+    
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in model.API_FIELDS]
+    if unknown:
+        return None, f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(model.API_FIELDS)}"
+    
+    return fields, None
+
+def field_load_options(model, fields, extra=()):
+    """Query options that load only the columns and relationships fields need"""
+    relationship_names = inspect(model).relationships.keys()
+    columns, relationships = [], []
+    
+    attrs = [attr for field in fields for attr in model.API_FIELDS[field]] + list(extra)
+    for attr in dict.fromkeys(attrs):
+        if attr in relationship_names:
+            relationships.append(joinedload(getattr(model, attr)))
+        else:
+            columns.append(getattr(model, attr))
+    
+    return [load_only(*columns)] + relationships
+
+# Article serialization shared by list, detail, search and batch endpoints
+_ARTICLE_FIELD_VALUES = {
+    'id': lambda a: a.id,
+    'title': lambda a: a.title,
+    'slug': lambda a: a.slug,
+    'excerpt': lambda a: a.excerpt,
+    'content': lambda a: a.content,
+    'featured_image': lambda a: a.featured_image,
+    'featured_image_alt': lambda a: a.featured_image_alt,
+    'meta_title': lambda a: a.meta_title,
+    'meta_description': lambda a: a.meta_description,
+    'tags': lambda a: a.tags.split(',') if a.tags else [],
+    'published_at': lambda a: a.published_at.isoformat() if a.published_at else None,
+    'updated_at': lambda a: a.updated_at.isoformat() if a.updated_at else None,
+    'author': lambda a: {
+        'id': a.author.id,
+        'name': f"{a.author.first_name} {a.author.last_name}",
+        'username': a.author.username
+    },
+    'category': lambda a: {
+        'id': a.category.id,
+        'name': a.category.name,
+        'slug': a.category.slug
+    },
+    'view_count': lambda a: a.view_count,
+    'comment_count': lambda a: a.comment_count,
+    'like_count': lambda a: a.like_count,
+    'share_count': lambda a: a.share_count,
+    'is_featured': lambda a: a.is_featured,
+    'is_breaking': lambda a: a.is_breaking
+}
+
+def serialize_article(article, include_content=False, fields=None):
+    """Serialize an article as a summary, in full, or limited to fields"""
+    if fields is None:
+        fields = Article.FULL_FIELDS if include_content else Article.SUMMARY_FIELDS
+    
+    data = {field: _ARTICLE_FIELD_VALUES[field](article) for field in fields}
+    
+    # The full view carries extra author and category details
+    if include_content:
+        if 'author' in data:
+            data['author'].update({
+                'bio': article.author.bio,
+                'avatar_url': article.author.avatar_url
+            })
+        if 'category' in data:
+            data['category']['color'] = article.category.color
+    
+    return data
+
+_COMMENT_FIELD_VALUES = {
+    'id': lambda c: c.id,
+    'content': lambda c: c.content,
+    'author_name': lambda c: c.author_name or (f"{c.user.first_name} {c.user.last_name}" if c.user else "Anonymous"),
+    'created_at': lambda c: c.created_at.isoformat(),
+    'like_count': lambda c: c.like_count,
+    'reply_count': lambda c: c.reply_count,
+    'parent_id': lambda c: c.parent_id
+}
+
+def serialize_comment(comment, fields=Comment.DEFAULT_FIELDS):
+    """Serialize a comment limited to fields"""
+    return {field: _COMMENT_FIELD_VALUES[field](comment) for field in fields}
 
 # Simple rate limiting
 class SimpleRateLimit:
-    _requests = {}
-    
     @classmethod
     def is_allowed(cls, key, limit=10, window=60):
-        """Simple in-memory rate limiting"""
-        now = time.time()
-        
-        # Clean old entries
-        cls._requests = {k: v for k, v in cls._requests.items() if now - v[-1] < window}
-        
-        if key not in cls._requests:
-            cls._requests[key] = []
-        
-        # Remove old requests outside window
-        cls._requests[key] = [t for t in cls._requests[key] if now - t < window]
-        
-        if len(cls._requests[key]) >= limit:
-            return False
-        
-        cls._requests[key].append(now)
-        return True
+        """Sliding-window limit shared by all workers on the host"""
+        return rate_limits.is_allowed(key, limit, window)
 
 # Authentication Routes
 @app.route('/api/auth/register', methods=['POST'])
@@ -229,7 +578,7 @@ def register():
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hasher.hash(password),
             first_name=data['first_name'].strip(),
             last_name=data['last_name'].strip(),
             role=data.get('role', 'author'),
@@ -250,6 +599,9 @@ def register():
             'verification_token': verification_token  # Only for testing
         })
         
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -275,12 +627,17 @@ def login():
             (User.username == username) | (User.email == username)
         ).first()
         
-        if not user or not check_password_hash(user.password_hash, password):
+        valid, new_hash = password_hasher.verify(user.password_hash, password) if user else (False, None)
+        if not valid:
             return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
         
         if not user.is_email_verified:
             return jsonify({'success': False, 'error': 'Please verify your email first'}), 401
         
+        # Move the stored hash to the configured work factor
+        if new_hash:
+            user.password_hash = new_hash
+        
         # Update last login
         user.last_login = datetime.utcnow()
         user.is_active = True
@@ -309,6 +666,8 @@ def login():
             }
         })
         
+    except PasswordHashingBusy:
+        return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -356,8 +715,13 @@ def search_articles():
         if not query or len(query) < 2:
             return jsonify({'success': False, 'error': 'Search query too short'}), 400
         
+        fields, error = parse_fields(Article, Article.SUMMARY_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
         # Build search query
-        search_query = Article.query.filter(Article.status == 'published')
+        search_query = Article.query.options(*field_load_options(Article, fields))\
+            .filter(Article.status == 'published')
         
         # Simple text search
         search_term = f"%{query}%"
@@ -382,26 +746,7 @@ def search_articles():
         return jsonify({
             'success': True,
             'data': {
-                'results': [{
-                    'id': article.id,
-                    'title': article.title,
-                    'slug': article.slug,
-                    'excerpt': article.excerpt,
-                    'featured_image': article.featured_image,
-                    'published_at': article.published_at.isoformat() if article.published_at else None,
-                    'author': {
-                        'id': article.author.id,
-                        'name': f"{article.author.first_name} {article.author.last_name}",
-                        'username': article.author.username
-                    },
-                    'category': {
-                        'id': article.category.id,
-                        'name': article.category.name,
-                        'slug': article.category.slug
-                    },
-                    'view_count': article.view_count,
-                    'comment_count': article.comment_count
-                } for article in results.items],
+                'results': [serialize_article(article, fields=fields) for article in results.items],
                 'pagination': {
                     'page': results.page,
                     'pages': results.pages,
@@ -425,11 +770,15 @@ def get_comments(article_id):
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 50)
         
+        fields, error = parse_fields(Comment, Comment.DEFAULT_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
         # Verify article exists
-        article = Article.query.get_or_404(article_id)
+        article = Article.query.options(load_only(Article.id)).get_or_404(article_id)
         
         # Get approved comments
-        comments = Comment.query.filter_by(
+        comments = Comment.query.options(*field_load_options(Comment, fields)).filter_by(
             article_id=article_id,
             status='approved'
         ).order_by(Comment.created_at.desc()).paginate(
@@ -439,15 +788,7 @@ def get_comments(article_id):
         return jsonify({
             'success': True,
             'data': {
-                'comments': [{
-                    'id': comment.id,
-                    'content': comment.content,
-                    'author_name': comment.author_name or (f"{comment.user.first_name} {comment.user.last_name}" if comment.user else "Anonymous"),
-                    'created_at': comment.created_at.isoformat(),
-                    'like_count': comment.like_count,
-                    'reply_count': comment.reply_count,
-                    'parent_id': comment.parent_id
-                } for comment in comments.items],
+                'comments': [serialize_comment(comment, fields) for comment in comments.items],
                 'pagination': {
                     'page': comments.page,
                     'pages': comments.pages,
@@ -489,11 +830,11 @@ def create_comment(article_id):
         author_email = data.get('author_email', '').strip()
         
         try:
-            from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+            from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
             verify_jwt_in_request(optional=True)
             user_id = get_jwt_identity()
             if user_id:
-                user = User.query.get(user_id)
+                user = identity_cache.get(User, user_id, get_jwt())
                 if user:
                     author_name = f"{user.first_name} {user.last_name}"
                     author_email = user.email
@@ -522,6 +863,7 @@ def create_comment(article_id):
         # Update article comment count if approved
         if comment.status == 'approved':
             article.comment_count += 1
+            article.comment_version = Article.comment_version + 1
         
         db.session.commit()
         
@@ -549,7 +891,11 @@ def get_articles():
         status = request.args.get('status', 'published')
         featured = request.args.get('featured', type=bool)
         
-        query = Article.query.filter_by(status=status)
+        fields, error = parse_fields(Article, Article.SUMMARY_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        query = Article.query.options(*field_load_options(Article, fields)).filter_by(status=status)
         
         if category_id:
             query = query.filter_by(category_id=category_id)
@@ -564,28 +910,7 @@ def get_articles():
         return jsonify({
             'success': True,
             'data': {
-                'articles': [{
-                    'id': article.id,
-                    'title': article.title,
-                    'slug': article.slug,
-                    'excerpt': article.excerpt,
-                    'featured_image': article.featured_image,
-                    'published_at': article.published_at.isoformat() if article.published_at else None,
-                    'author': {
-                        'id': article.author.id,
-                        'name': f"{article.author.first_name} {article.author.last_name}",
-                        'username': article.author.username
-                    },
-                    'category': {
-                        'id': article.category.id,
-                        'name': article.category.name,
-                        'slug': article.category.slug
-                    },
-                    'view_count': article.view_count,
-                    'comment_count': article.comment_count,
-                    'is_featured': article.is_featured,
-                    'is_breaking': article.is_breaking
-                } for article in articles.items],
+                'articles': [serialize_article(article, fields=fields) for article in articles.items],
                 'pagination': {
                     'page': articles.page,
                     'pages': articles.pages,
@@ -600,51 +925,177 @@ def get_articles():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/articles/batch', methods=['GET'])
+def get_articles_batch():
+    """Get several articles by id and/or slug in one request"""
+    try:
+        raw_ids = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+        slugs = [value.strip() for value in request.args.get('slugs', '').split(',') if value.strip()]
+        view = request.args.get('view', 'summary')  # summary, full; ?fields= narrows either
+        
+        invalid_ids = [value for value in raw_ids if not value.isdigit()]
+        if invalid_ids:
+            return jsonify({'success': False, 'error': f"ids must be integers: {', '.join(invalid_ids)}"}), 400
+        ids = [int(value) for value in raw_ids]
+        
+        if not ids and not slugs:
+            return jsonify({'success': False, 'error': 'ids or slugs are required'}), 400
+        
+        if len(ids) + len(slugs) > MAX_BATCH_ARTICLES:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_ARTICLES} articles per request'}), 400
+        
+        if view not in ('summary', 'full'):
+            return jsonify({'success': False, 'error': 'view must be summary or full'}), 400
+        
+        include_content = view == 'full'
+        
+        fields, error = parse_fields(Article, Article.FULL_FIELDS if include_content else Article.SUMMARY_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        # One IN query for everything requested; slug is always needed to match
+        query = Article.query.options(*field_load_options(Article, fields, extra=('slug',)))
+        articles = query.filter(or_(Article.id.in_(ids), Article.slug.in_(slugs))).all()
+        
+        by_id = {article.id: article for article in articles}
+        by_slug = {article.slug: article for article in articles}
+        
+        # Preserve the requested order: ids first, then slugs
+        ordered = []
+        seen = set()
+        for article in [by_id.get(i) for i in ids] + [by_slug.get(s) for s in slugs]:
+            if article is not None and article.id not in seen:
+                seen.add(article.id)
+                ordered.append(article)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'articles': [serialize_article(article, include_content, fields) for article in ordered],
+                'missing': {
+                    'ids': [i for i in ids if i not in by_id],
+                    'slugs': [s for s in slugs if s not in by_slug]
+                }
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/articles/changes', methods=['GET'])
+def get_article_changes():
+    """Articles created, updated, unpublished or deleted since a sync cursor"""
+    try:
+        since = request.args.get('since', '').strip()
+        limit = max(1, min(request.args.get('limit', 100, type=int), MAX_SYNC_CHANGES))
+        
+        fields, error = parse_fields(Article, Article.SUMMARY_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        now = datetime.utcnow()
+        until = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+        
+        articles_query = Article.query.options(
+            *field_load_options(Article, fields, extra=('status', 'updated_at'))
+        ).filter(
+            # Drafts that were never published are of no interest to readers
+            or_(Article.status == 'published', Article.published_at.isnot(None)),
+            Article.updated_at <= until
+        )
+        tombstones_query = ArticleTombstone.query.filter(ArticleTombstone.deleted_at <= until)
+        
+        if since:
+            try:
+                since_at, since_id = decode_sync_cursor(since)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+            
+            if since_at < now - SYNC_TOMBSTONE_RETENTION:
+                return jsonify({'success': False, 'error': 'Cursor expired, full resync required'}), 410
+            
+            articles_query = articles_query.filter(or_(
+                Article.updated_at > since_at,
+                and_(Article.updated_at == since_at, Article.id > since_id)
+            ))
+            tombstones_query = tombstones_query.filter(or_(
+                ArticleTombstone.deleted_at > since_at,
+                and_(ArticleTombstone.deleted_at == since_at, ArticleTombstone.article_id > since_id)
+            ))
+        
+        # Both streams share the (timestamp, id) order, so fetch limit + 1 of
+        # each and merge
+        articles = articles_query.order_by(Article.updated_at, Article.id).limit(limit + 1).all()
+        tombstones = tombstones_query.order_by(
+            ArticleTombstone.deleted_at, ArticleTombstone.article_id
+        ).limit(limit + 1).all()
+        
+        merged = sorted(
+            [(article.updated_at, article.id, article) for article in articles] +
+            [(tombstone.deleted_at, tombstone.article_id, None) for tombstone in tombstones],
+            key=lambda change: (change[0], change[1])
+        )
+        has_more = len(merged) > limit
+        merged = merged[:limit]
+        
+        changes = []
+        for changed_at, article_id, article in merged:
+            if article is None:
+                changes.append({'op': 'delete', 'id': article_id})
+            elif article.status != 'published':
+                changes.append({'op': 'unpublish', 'id': article_id})
+            else:
+                changes.append({
+                    'op': 'upsert',
+                    'id': article_id,
+                    'article': serialize_article(article, fields=fields)
+                })
+        
+        if merged:
+            cursor = encode_sync_cursor(merged[-1][0], merged[-1][1])
+        else:
+            cursor = since or None
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'changes': changes,
+                'cursor': cursor,
+                'has_more': has_more
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/articles/<int:article_id>', methods=['GET'])
 def get_article(article_id):
     """Get single article by ID"""
     try:
-        article = Article.query.get_or_404(article_id)
+        fields, error = parse_fields(Article, Article.FULL_FIELDS)
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        article = Article.query.options(*field_load_options(Article, fields)).get_or_404(article_id)
         
-        # Increment view count
-        article.view_count += 1
+        data = serialize_article(article, include_content=True, fields=fields)
+        
+        # Increment view count atomically, leaving updated_at alone so views
+        # do not show up in the sync feed
+        articles = Article.__table__
+        db.session.execute(
+            articles.update()
+            .where(articles.c.id == article.id)
+            .values(view_count=articles.c.view_count + 1, updated_at=articles.c.updated_at)
+        )
         db.session.commit()
         
+        if 'view_count' in data:
+            data['view_count'] += 1
+        
         return jsonify({
             'success': True,
-            'data': {
-                'id': article.id,
-                'title': article.title,
-                'slug': article.slug,
-                'content': article.content,
-                'excerpt': article.excerpt,
-                'featured_image': article.featured_image,
-                'featured_image_alt': article.featured_image_alt,
-                'meta_title': article.meta_title,
-                'meta_description': article.meta_description,
-                'tags': article.tags.split(',') if article.tags else [],
-                'published_at': article.published_at.isoformat() if article.published_at else None,
-                'updated_at': article.updated_at.isoformat(),
-                'author': {
-                    'id': article.author.id,
-                    'name': f"{article.author.first_name} {article.author.last_name}",
-                    'username': article.author.username,
-                    'bio': article.author.bio,
-                    'avatar_url': article.author.avatar_url
-                },
-                'category': {
-                    'id': article.category.id,
-                    'name': article.category.name,
-                    'slug': article.category.slug,
-                    'color': article.category.color
-                },
-                'view_count': article.view_count,
-                'comment_count': article.comment_count,
-                'like_count': article.like_count,
-                'share_count': article.share_count,
-                'is_featured': article.is_featured,
-                'is_breaking': article.is_breaking
-            }
+            'data': data
         })
         
     except Exception as e:
@@ -665,7 +1116,7 @@ def get_categories():
                 'slug': cat.slug,
                 'description': cat.description,
                 'color': cat.color,
-                'article_count': len(cat.articles)
+                'article_count': cat.article_count
             } for cat in categories]
         })
         
@@ -713,6 +1164,24 @@ def get_dashboard_stats():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/auth/metrics', methods=['GET'])
+@jwt_required()
+def get_auth_metrics():
+    """Password hashing pool and rate limiter metrics (admins only)"""
+    # Checked against the user row, so a demoted admin's token stops working within the cache TTL
+    user = identity_cache.get(User, get_jwt_identity(), get_jwt())
+    if user is None or user.role != 'admin':
+        return jsonify({'success': False, 'error': 'Admin access required'}), 403
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'password_hashing': password_hasher.stats(),
+            'rate_limits': rate_limits.stats(),
+            'identity_cache': identity_cache.stats()
+        }
+    })
+
 # Health check
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -6,7 +6,6 @@ For GlobalPerspective News Platform
 
 from flask import Flask, request, jsonify, current_app
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, create_refresh_token, get_jwt_identity, get_jwt
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import secrets
 import hashlib
@@ -14,11 +13,13 @@ import time
 from functools import wraps
 import re
 import logging
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from token_revocation import create_revocation_store
+from rate_limiter import RateLimiter, rate_limits
+from password_hashing import password_hasher, PasswordHashingBusy
+from identity_cache import identity_cache
 
 # Security Configuration
 class SecurityConfig:
@@ -29,8 +30,7 @@ class SecurityConfig:
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
     
-    # Rate Limiting
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Rate Limiting (counters shared by all workers, see rate_limiter.py)
     RATELIMIT_DEFAULT = "100 per hour"
     
     # Password Requirements
@@ -58,18 +58,18 @@ def init_security(app):
     jwt = JWTManager(app)
     
     # Rate Limiter
-    limiter = Limiter(
+    limiter = RateLimiter(
         app,
-        key_func=get_remote_address,
+        key_func=lambda: request.remote_addr,
         default_limits=[SecurityConfig.RATELIMIT_DEFAULT]
     )
     
-    # Blacklisted tokens storage (in production, use Redis)
-    blacklisted_tokens = set()
+    # Revoked token ids, shared by every worker (TOKEN_REVOCATION_URL) and kept until each token expires
+    revoked_tokens = create_revocation_store()
     
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        return jwt_payload['jti'] in blacklisted_tokens
+        return revoked_tokens.is_revoked(jwt_payload['jti'])
     
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
@@ -94,7 +94,7 @@ def init_security(app):
             response.headers[header] = value
         return response
     
-    return jwt, limiter, blacklisted_tokens
+    return jwt, limiter, revoked_tokens
 
 # Password validation
 def validate_password(password):
@@ -156,7 +156,7 @@ def verify_password_reset_token(token, user_id, max_age=3600):
         return False
 
 # Authentication routes
-def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
+def create_auth_routes(app, db, User, limiter, revoked_tokens):
     """Create authentication routes"""
     
     @app.route('/api/auth/register', methods=['POST'])
@@ -196,7 +196,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
             user = User(
                 username=username,
                 email=email,
-                password_hash=generate_password_hash(password),
+                password_hash=password_hasher.hash(password),
                 first_name=data['first_name'].strip(),
                 last_name=data['last_name'].strip(),
                 role=data.get('role', 'author'),
@@ -216,6 +216,9 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 'user_id': user.id
             })
             
+        except PasswordHashingBusy:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -238,12 +241,17 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 (User.username == username) | (User.email == username)
             ).first()
             
-            if not user or not check_password_hash(user.password_hash, password):
+            valid, new_hash = password_hasher.verify(user.password_hash, password) if user else (False, None)
+            if not valid:
                 return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
             
             if not user.is_active:
                 return jsonify({'success': False, 'error': 'Account not verified. Please check your email.'}), 401
             
+            # Move the stored hash to the configured work factor
+            if new_hash:
+                user.password_hash = new_hash
+            
             # Update last login
             user.last_login = datetime.utcnow()
             db.session.commit()
@@ -273,6 +281,8 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 }
             })
             
+        except PasswordHashingBusy:
+            return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
@@ -282,7 +292,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
         """Refresh JWT access token"""
         try:
             current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = identity_cache.get(User, current_user_id, get_jwt())
             
             if not user or not user.is_active:
                 return jsonify({'success': False, 'error': 'User not found or inactive'}), 404
@@ -307,10 +317,10 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
     @app.route('/api/auth/logout', methods=['POST'])
     @jwt_required()
     def logout():
-        """Logout and blacklist token"""
+        """Logout and revoke token"""
         try:
-            jti = get_jwt()['jti']
-            blacklisted_tokens.add(jti)
+            claims = get_jwt()
+            revoked_tokens.revoke(claims['jti'], claims.get('exp'))
             
             return jsonify({
                 'success': True,
@@ -404,7 +414,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 return jsonify({'success': False, 'error': 'Reset token has expired'}), 400
             
             # Update password
-            user.password_hash = generate_password_hash(new_password)
+            user.password_hash = password_hasher.hash(new_password)
             user.password_reset_token = None
             user.password_reset_requested_at = None
             user.password_changed_at = datetime.utcnow()
@@ -415,6 +425,9 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 'message': 'Password reset successfully. You can now log in with your new password.'
             })
             
+        except PasswordHashingBusy:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -438,7 +451,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 return jsonify({'success': False, 'error': 'User not found'}), 404
             
             # Verify current password
-            if not check_password_hash(user.password_hash, current_password):
+            if not password_hasher.verify(user.password_hash, current_password)[0]:
                 return jsonify({'success': False, 'error': 'Current password is incorrect'}), 400
             
             # Validate new password
@@ -447,7 +460,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 return jsonify({'success': False, 'error': password_errors}), 400
             
             # Update password
-            user.password_hash = generate_password_hash(new_password)
+            user.password_hash = password_hasher.hash(new_password)
             user.password_changed_at = datetime.utcnow()
             db.session.commit()
             
@@ -456,6 +469,9 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
                 'message': 'Password changed successfully'
             })
             
+        except PasswordHashingBusy:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Server busy, please try again shortly'}), 429, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -466,7 +482,7 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
         """Get current user profile"""
         try:
             current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = identity_cache.get(User, current_user_id, get_jwt())
             
             if not user:
                 return jsonify({'success': False, 'error': 'User not found'}), 404
@@ -490,6 +506,19 @@ def create_auth_routes(app, db, User, limiter, blacklisted_tokens):
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/admin/auth/metrics', methods=['GET'])
+    @admin_required
+    def get_auth_metrics():
+        """Password hashing pool and rate limiter metrics"""
+        return jsonify({
+            'success': True,
+            'data': {
+                'password_hashing': password_hasher.stats(),
+                'rate_limits': rate_limits.stats(),
+                'identity_cache': identity_cache.stats()
+            }
+        })
+
 # Email sending functions (implement with your email service)
 def send_verification_email(email, token):
     """Send email verification email"""
@@ -581,12 +610,12 @@ def setup_security_for_app(app, db, User):
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = SecurityConfig.JWT_REFRESH_TOKEN_EXPIRES
     
     # Initialize security components
-    jwt, limiter, blacklisted_tokens = init_security(app)
+    jwt, limiter, revoked_tokens = init_security(app)
     
     # Create authentication routes
-    create_auth_routes(app, db, User, limiter, blacklisted_tokens)
+    create_auth_routes(app, db, User, limiter, revoked_tokens)
     
-    return jwt, limiter, blacklisted_tokens
+    return jwt, limiter, revoked_tokens
 
 if __name__ == "__main__":
     print("JWT Authentication System and Security Enhancements")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Pool
+For GlobalPerspective News Platform
+
+Password hashes are deliberately expensive (scrypt by default), and
+computing them on the request worker lets a login spike, such as a
+credential-stuffing run, starve every other route on that worker. Hashing
+and verification run instead in a small process pool with its own queue.
+The request thread only waits on the result, holding no CPU or GIL.
+
+Admission is bounded: once PASSWORD_HASH_QUEUE jobs are pending, further
+calls raise PasswordHashingBusy straight away, and routes turn that into a
+429 instead of queueing behind an attack.
+
+The work factor is PASSWORD_HASH_METHOD (a werkzeug method string). A
+successful verify() against a hash made with another method also returns
+a fresh hash, so stored hashes move to the configured cost as users log in.
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # In full, as it prefixes stored hashes
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', str(PASSWORD_HASH_WORKERS * 8)))  # Pending jobs before 429
+PASSWORD_HASH_TIMEOUT = 10  # Seconds a request waits for its job
+LATENCY_SAMPLES = 1000  # Recent job latencies kept for percentiles
+
+class PasswordHashingBusy(Exception):
+    """The hashing queue is full; retry later"""
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+def _verify(password_hash, password, method):
+    # Runs in a pool process: check, and rehash in the same job if the method is outdated
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_hash.split('$', 1)[0] != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+class PasswordHasher:
+    """Password hashing and verification off the request thread"""
+    
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_QUEUE):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._latencies = {'hash': deque(maxlen=LATENCY_SAMPLES), 'verify': deque(maxlen=LATENCY_SAMPLES)}
+    
+    def _executor(self):
+        # Caller holds self._lock. Pools do not survive a fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            # forkserver children start clean instead of copying a threaded server process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            if 'forkserver' in methods:
+                context.set_forkserver_preload([__name__])
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pid = os.getpid()
+        return self._pool
+    
+    def _run(self, kind, function, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashingBusy(f"{self.pending} password jobs pending")
+            future = self._executor().submit(function, *args)
+            self.pending += 1
+        
+        # pending drops when the job finishes, not when the caller gives up on it
+        submitted = time.perf_counter()
+        future.add_done_callback(lambda _: self._finished(kind, submitted))
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            raise PasswordHashingBusy("Password job timed out")
+        except BrokenProcessPool:
+            with self._lock:
+                self._pid = None  # A pool process died; start a new pool on the next call
+            raise
+    
+    def _finished(self, kind, submitted):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self._latencies[kind].append(time.perf_counter() - submitted)
+    
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run('hash', _hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        """(valid, new_hash); new_hash is set when the stored hash should be replaced"""
+        valid, new_hash = self._run('verify', _verify, password_hash, password, self.method)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+    
+    def stats(self):
+        with self._lock:
+            latencies = {kind: sorted(samples) for kind, samples in self._latencies.items()}
+            stats = {
+                'method': self.method,
+                'workers': self.workers,
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed
+            }
+        for kind, samples in latencies.items():
+            stats[f'{kind}_ms'] = {
+                'p50': round(samples[len(samples) // 2] * 1000, 1),
+                'p95': round(samples[int(len(samples) * 0.95)] * 1000, 1),
+                'max': round(samples[-1] * 1000, 1)
+            } if samples else None
+        return stats
+
+password_hasher = PasswordHasher()
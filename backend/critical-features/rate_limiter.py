@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Shared Rate Limiter
+For GlobalPerspective News Platform
+
+One engine for every rate limit in the backend (registration, login,
+comments, verification and reset emails, and the auth route limits).
+Each limited key has a sliding-window counter: the count for the current
+fixed window plus the count for the previous one, weighted by how much of
+the previous window still overlaps the sliding one. A check is O(1) and
+keeps "N per window" meaning what it says.
+
+Counters live in a fixed-size hash table in a file mapped into every worker
+on the host (/dev/shm when available), so a limit holds across workers
+instead of being multiplied by their number:
+
+    header | SLOT_COUNT records of (key hash, expires at, window start, current, previous)
+
+A key probes up to PROBE_LENGTH slots from its hash. Nothing sweeps the
+table: a record whose expiry has passed counts as empty and is overwritten
+in place. If every probed slot is live, the record closest to expiring is
+evicted.
+"""
+
+import os
+import re
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import tempfile
+import threading
+from functools import wraps, lru_cache
+from contextlib import contextmanager
+from flask import request, jsonify
+
+SLOT_COUNT = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+PROBE_LENGTH = 8  # Slots searched per key before evicting
+
+_MAGIC = b'GPRATE01'
+_HEADER = struct.Struct('<8sQ')  # magic, slots
+_RECORD = struct.Struct('<Qddff')  # key hash, expires at, window start, current, previous
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_SPEC = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+def default_path():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'globalperspective_rate_limits')
+
+@lru_cache(maxsize=None)
+def parse_limit(spec):
+    """'5 per minute' or '100/hour' -> (limit, window seconds)"""
+    match = _SPEC.match(spec)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {spec}")
+    count, multiplier, period = match.groups()
+    return int(count), int(multiplier or 1) * _PERIODS[period.lower()]
+
+class RateLimitTable:
+    """Sliding-window counters in a hash table shared through mmap"""
+    
+    def __init__(self, path=None, slots=SLOT_COUNT):
+        self.path = path or os.getenv('RATE_LIMIT_PATH') or default_path()
+        self.slots = slots
+        self._pid = None
+        self._lock = None
+        self._lock_handle = None
+        self._map = None
+        self.checks = 0
+        self.denied = 0
+        self.evictions = 0
+    
+    def _size(self):
+        return _HEADER.size + _RECORD.size * self.slots
+    
+    def _attach(self):
+        # flock is per open file, so every forked worker needs its own handle
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._lock_handle = open(self.path + '.lock', 'a')
+        
+        with self._locked():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fresh = os.fstat(fd).st_size != self._size()
+                if fresh:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self._size())
+                self._map = mmap.mmap(fd, self._size())
+            finally:
+                os.close(fd)
+            
+            if fresh or _HEADER.unpack_from(self._map, 0) != (_MAGIC, self.slots):
+                self._map[:] = bytes(self._size())
+                _HEADER.pack_into(self._map, 0, _MAGIC, self.slots)
+    
+    @contextmanager
+    def _locked(self):
+        # The thread lock covers threads sharing this process's flock handle
+        with self._lock:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_handle, fcntl.LOCK_UN)
+    
+    def hit(self, key, limit, window):
+        """Count one request for key against limit per window
+        
+        Returns (allowed, retry_after seconds). Denied requests are not counted.
+        """
+        self._attach()
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+        now = time.time()
+        start = (now // window) * window
+        self.checks += 1
+        
+        with self._locked():
+            data = self._map
+            base = key_hash % self.slots
+            offset = None
+            free = None
+            victim, victim_expiry = None, None
+            for probe in range(PROBE_LENGTH):
+                slot_offset = _HEADER.size + _RECORD.size * ((base + probe) % self.slots)
+                stored_hash, expires_at = struct.unpack_from('<Qd', data, slot_offset)
+                if stored_hash == key_hash:
+                    offset = slot_offset
+                    break
+                if expires_at <= now:
+                    if free is None:
+                        free = slot_offset
+                elif victim is None or expires_at < victim_expiry:
+                    victim, victim_expiry = slot_offset, expires_at
+            
+            current = previous = 0.0
+            if offset is not None:
+                _, expires_at, stored_start, stored_current, stored_previous = _RECORD.unpack_from(data, offset)
+                if expires_at > now:
+                    if stored_start == start:
+                        current, previous = stored_current, stored_previous
+                    elif stored_start == start - window:
+                        previous = stored_current
+            elif free is not None:
+                offset = free
+            else:
+                offset = victim
+                self.evictions += 1
+            
+            elapsed = now - start
+            if previous * (1 - elapsed / window) + current + 1 > limit:
+                self.denied += 1
+                return False, self._retry_after(limit, window, elapsed, current, previous)
+            
+            _RECORD.pack_into(data, offset, key_hash, start + 2 * window, start, current + 1, previous)
+            return True, 0.0
+    
+    @staticmethod
+    def _retry_after(limit, window, elapsed, current, previous):
+        """Seconds until one more request fits"""
+        room = limit - 1 - current
+        if room >= 0 and previous:
+            # The previous window's weight has to fall to room / previous within this window
+            return max(0.0, (1 - room / previous) * window - elapsed)
+        # This window is full on its own: wait until its count, as the previous one, has decayed enough
+        return window - elapsed + (1 - (limit - 1) / current) * window
+    
+    def is_allowed(self, key, limit, window):
+        return self.hit(key, limit, window)[0]
+    
+    def stats(self):
+        return {
+            'checks': self.checks,
+            'denied': self.denied,
+            'evictions': self.evictions,
+            'slots': self.slots,
+            'path': self.path
+        }
+
+rate_limits = RateLimitTable()
+
+class RateLimiter:
+    """Flask route limits backed by rate_limits
+    
+    limit('5 per minute') decorates a view; views without their own limit
+    get default_limits. Limits apply per view and per key_func value (the
+    client IP by default), and a rejected request gets a 429 with Retry-After.
+    """
+    
+    def __init__(self, app=None, key_func=None, default_limits=(), table=None):
+        self.key_func = key_func or (lambda: request.remote_addr)
+        self.default_limits = [parse_limit(spec) for spec in default_limits]
+        self.table = table or rate_limits
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        @app.before_request
+        def apply_default_limits():
+            view = app.view_functions.get(request.endpoint)
+            if view is None or getattr(view, 'rate_limited', False):
+                return None
+            return self._check(request.endpoint, self.default_limits, self.key_func)
+    
+    def _check(self, scope, limits, key_func):
+        key = key_func()
+        for limit, window in limits:
+            allowed, retry_after = self.table.hit(f"route:{scope}:{limit}/{window}:{key}", limit, window)
+            if not allowed:
+                response = jsonify({'success': False, 'error': 'Rate limit exceeded'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(int(retry_after) + 1)
+                return response
+        return None
+    
+    def limit(self, *specs, key_func=None):
+        """Decorator limiting a view, e.g. @limiter.limit('5 per minute')"""
+        limits = [parse_limit(spec) for spec in specs]
+        
+        def decorator(view):
+            @wraps(view)
+            def limited(*args, **kwargs):
+                rejected = self._check(view.__name__, limits, key_func or self.key_func)
+                if rejected is not None:
+                    return rejected
+                return view(*args, **kwargs)
+            
+            limited.rate_limited = True
+            return limited
+        
+        return decorator
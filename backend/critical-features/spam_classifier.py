@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Online Spam Classifier for Comments
+For GlobalPerspective News Platform
+
+Multinomial naive Bayes over hashed token features, trained one moderation
+decision at a time. The model is four arrays (per-class token counts, the
+per-feature log-odds derived from them, plus class totals), so scoring a
+comment is one gather-and-sum over its feature indices.
+
+The model file is shared by every worker on the host: learn() applies its
+update to the file under an exclusive lock and other workers pick the new
+file up on their next score.
+"""
+
+import os
+import re
+import time
+import zlib
+import fcntl
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+SPAM_MODEL_PATH = os.getenv('SPAM_MODEL_PATH', 'spam_model.npz')
+FEATURE_BITS = 18  # 262,144 hashed features, about 3MB of arrays
+SMOOTHING = 1.0  # Laplace smoothing for token counts
+MIN_TRAINING_DOCS = 20  # Per class, before probabilities are trusted
+RELOAD_CHECK_INTERVAL = 5  # Seconds between model file checks
+
+_TOKEN_PATTERN = re.compile(r"https?://[^\s/]+|[a-z0-9][a-z0-9'_-]*")
+
+def comment_features(text, author_email=None, feature_bits=FEATURE_BITS):
+    """Hashed feature indices for a comment: words, word pairs, link hosts
+    and the author's email domain. Repeated features repeat in the array."""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    if author_email and '@' in author_email:
+        features.append('@' + author_email.rsplit('@', 1)[1].lower())
+    
+    mask = (1 << feature_bits) - 1
+    return np.fromiter(
+        (zlib.crc32(feature.encode('utf-8')) & mask for feature in features),
+        dtype=np.int64, count=len(features)
+    )
+
+class SpamClassifier:
+    """Naive Bayes spam model stored as compact NumPy arrays"""
+    
+    def __init__(self, path=SPAM_MODEL_PATH, feature_bits=FEATURE_BITS):
+        self.path = path
+        self.feature_bits = feature_bits
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._reset()
+        self._load()
+    
+    def _reset(self):
+        size = 1 << self.feature_bits
+        self.spam_counts = np.zeros(size, dtype=np.float32)
+        self.ham_counts = np.zeros(size, dtype=np.float32)
+        self.weights = np.zeros(size, dtype=np.float32)  # log P(f|spam) - log P(f|ham), unnormalised
+        self.spam_docs = self.ham_docs = 0
+        self.spam_tokens = self.ham_tokens = 0.0
+    
+    @property
+    def trained(self):
+        return self.spam_docs >= MIN_TRAINING_DOCS and self.ham_docs >= MIN_TRAINING_DOCS
+    
+    def probability(self, text, author_email=None):
+        """Spam probability, or None until the model has seen enough of both classes"""
+        self._maybe_reload()
+        if not self.trained:
+            return None
+        features = comment_features(text, author_email, self.feature_bits)
+        odds = float(self.weights[features].sum()) - len(features) * self._normaliser() + self._prior()
+        return 1.0 / (1.0 + np.exp(-min(max(odds, -50.0), 50.0)))
+    
+    def batch_probabilities(self, feature_lists):
+        """Spam probabilities for many comments in one vectorised pass, or None"""
+        self._maybe_reload()
+        if not self.trained:
+            return None
+        odds = self._log_odds(feature_lists)
+        return 1.0 / (1.0 + np.exp(-np.clip(odds, -50, 50)))
+    
+    def _log_odds(self, feature_lists):
+        lengths = np.array([len(features) for features in feature_lists], dtype=np.int64)
+        indices = np.concatenate(feature_lists) if lengths.sum() else np.zeros(0, dtype=np.int64)
+        owners = np.repeat(np.arange(len(feature_lists)), lengths)
+        
+        sums = np.bincount(owners, weights=self.weights[indices], minlength=len(feature_lists))
+        return sums - lengths * self._normaliser() + self._prior()
+    
+    def _normaliser(self):
+        # Per-token share of log P(f|spam) - log P(f|ham) that depends on class totals
+        size = len(self.weights)
+        return float(np.log(self.spam_tokens + SMOOTHING * size) - np.log(self.ham_tokens + SMOOTHING * size))
+    
+    def _prior(self):
+        return float(np.log(self.spam_docs + 1) - np.log(self.ham_docs + 1))
+    
+    def learn(self, examples):
+        """Apply (features, is_spam, weight) examples; weight -1 unlearns"""
+        deltas = [(features, is_spam, weight) for features, is_spam, weight in examples if len(features)]
+        if not deltas:
+            return
+        
+        with self._lock, self._file_lock():
+            self._load(force=True)
+            # One scatter-add per class, so a bulk moderation costs about the same as one decision
+            for is_spam, counts in ((True, self.spam_counts), (False, self.ham_counts)):
+                batch = [(features, weight) for features, spam, weight in deltas if spam == is_spam]
+                if not batch:
+                    continue
+                np.add.at(counts, np.concatenate([features for features, _ in batch]),
+                          np.repeat([weight for _, weight in batch], [len(features) for features, _ in batch]))
+                np.maximum(counts, 0, out=counts)
+                docs = sum(weight for _, weight in batch)
+                tokens = sum(weight * len(features) for features, weight in batch)
+                if is_spam:
+                    self.spam_docs = max(0, self.spam_docs + docs)
+                    self.spam_tokens = max(0.0, self.spam_tokens + tokens)
+                else:
+                    self.ham_docs = max(0, self.ham_docs + docs)
+                    self.ham_tokens = max(0.0, self.ham_tokens + tokens)
+            
+            touched = np.unique(np.concatenate([features for features, _, _ in deltas]))
+            self.weights[touched] = (
+                np.log(self.spam_counts[touched] + SMOOTHING) - np.log(self.ham_counts[touched] + SMOOTHING)
+            )
+            self._save()
+    
+    def stats(self):
+        return {
+            'spam_docs': int(self.spam_docs),
+            'ham_docs': int(self.ham_docs),
+            'features_seen': int(np.count_nonzero(self.spam_counts + self.ham_counts)),
+            'trained': self.trained,
+            'path': self.path
+        }
+    
+    @contextmanager
+    def _file_lock(self):
+        with open(self.path + '.lock', 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+    
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at >= RELOAD_CHECK_INTERVAL:
+            with self._lock:
+                self._load()
+    
+    def _load(self, force=False):
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime and not force:
+            return
+        
+        with np.load(self.path) as data:
+            if data['spam_counts'].shape[0] != 1 << self.feature_bits:
+                print(f"⚠️ Ignoring spam model {self.path}: built with a different feature size")
+                return
+            self.spam_counts = data['spam_counts'].astype(np.float32)
+            self.ham_counts = data['ham_counts'].astype(np.float32)
+            self.spam_docs, self.ham_docs = (int(value) for value in data['docs'])
+            self.spam_tokens, self.ham_tokens = (float(value) for value in data['tokens'])
+        self.weights = (np.log(self.spam_counts + SMOOTHING) - np.log(self.ham_counts + SMOOTHING)).astype(np.float32)
+        self._mtime = mtime
+    
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(
+                f,
+                spam_counts=self.spam_counts,
+                ham_counts=self.ham_counts,
+                docs=np.array([self.spam_docs, self.ham_docs]),
+                tokens=np.array([self.spam_tokens, self.ham_tokens])
+            )
+        os.replace(temp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+spam_classifier = SpamClassifier()
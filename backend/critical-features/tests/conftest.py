@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import textwrap
+from datetime import datetime
+
+import pytest
+
+_state = tempfile.mkdtemp(prefix='globalperspective-tests-')
+for name, filename in {
+    'SPAM_MODEL_PATH': 'spam_model.npz',
+    'REPUTATION_SNAPSHOT_PATH': 'comment_reputation.snapshot',
+    'REPUTATION_STORE_PATH': 'comment_reputation.table',
+    'COMMENT_OUTBOX_PATH': 'comment_outbox.db',
+    'COMMENT_FINGERPRINT_PATH': 'comment_fingerprints',
+    'COMMENT_STREAM_LOG_PATH': 'comment_stream.db'
+}.items():
+    os.environ.setdefault(name, os.path.join(_state, filename))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager, create_access_token
+import comment_system
+from comment_notifications import comment_outbox
+
+@pytest.fixture(scope='session')
+def comment_app():
+    """The comment routes on an in-memory database, with minimal User and Article models"""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', JWT_SECRET_KEY='test-secret-key-for-comment-tests', TESTING=True)
+    db = SQLAlchemy(app)
+    JWTManager(app)
+    
+    class User(db.Model):
+        __tablename__ = 'users'
+        id = db.Column(db.Integer, primary_key=True)
+        username = db.Column(db.String(50))
+        email = db.Column(db.String(120))
+        role = db.Column(db.String(20), default='author')
+    
+    class Article(db.Model):
+        __tablename__ = 'articles'
+        id = db.Column(db.Integer, primary_key=True)
+        title = db.Column(db.String(200))
+        status = db.Column(db.String(20), default='published')
+        comment_count = db.Column(db.Integer, default=0)
+        comment_version = db.Column(db.Integer, default=0, nullable=False)
+        author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+        author = db.relationship('User')
+    
+    namespace = {'db': db, 'datetime': datetime}
+    exec(textwrap.dedent(comment_system.update_comment_model()), namespace)
+    Comment = namespace['Comment']
+    
+    comment_outbox.workers = 0  # Nothing is delivered from tests
+    comment_system.create_comment_routes(app, db, Comment, Article, User)
+    
+    app.db, app.models = db, {'User': User, 'Article': Article, 'Comment': Comment}
+    return app
+
+@pytest.fixture
+def app(comment_app):
+    db = comment_app.db
+    with comment_app.app_context():
+        db.create_all()
+        yield comment_app
+        db.session.remove()
+        db.drop_all()
+    for article_id in list(comment_system.comment_thread_cache._article_keys):
+        comment_system.comment_thread_cache.invalidate(article_id)
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app):
+    User = app.models['User']
+    app.db.session.add(User(id=1, username='admin', email='admin@example.org', role='admin'))
+    app.db.session.commit()
+    token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,26 @@
+from flask_jwt_extended import create_access_token
+
+def commenter_headers(app):
+    User = app.models['User']
+    if app.db.session.get(User, 2) is None:
+        app.db.session.add(User(id=2, username='reader', email='reader@example.org', role='author'))
+        app.db.session.commit()
+    # A forged or stale role claim is not enough; the user row decides
+    token = create_access_token(identity='2', additional_claims={'role': 'admin'})
+    return {'Authorization': f'Bearer {token}'}
+
+def test_reputation_requires_admin(app, client, admin_headers):
+    query = '/api/admin/comments/reputation?ip=203.0.113.7'
+    assert client.get(query, headers=commenter_headers(app)).status_code == 403
+    assert client.get(query, headers=admin_headers).status_code == 200
+
+def test_digest_window_requires_admin(app, client, admin_headers):
+    body = {'recipient': 'author@example.org', 'seconds': 600}
+    url = '/api/admin/comments/notifications/digest-window'
+    assert client.put(url, json=body, headers=commenter_headers(app)).status_code == 403
+    assert client.get('/api/admin/comments/notifications', headers=commenter_headers(app)).status_code == 403
+    assert client.put(url, json=body, headers=admin_headers).status_code == 200
+
+def test_cache_stats_require_admin(app, client, admin_headers):
+    assert client.get('/api/admin/comments/cache', headers=commenter_headers(app)).status_code == 403
+    assert client.get('/api/admin/comments/cache', headers=admin_headers).status_code == 200
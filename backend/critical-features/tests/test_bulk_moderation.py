@@ -0,0 +1,25 @@
+def test_bulk_delete_of_hidden_parent_refreshes_promoted_replies(app, client, admin_headers):
+    Article, Comment = app.models['Article'], app.models['Comment']
+    app.db.session.add(Article(id=1, title='Article'))
+    app.db.session.commit()
+    
+    parent = client.post('/api/articles/1/comments', json={
+        'content': 'The parent comment', 'author_name': 'Reader', 'author_email': 'reader@example.org'
+    }).get_json()['data']['id']
+    reply = client.post('/api/articles/1/comments', json={
+        'content': 'The reply to it', 'author_name': 'Reader', 'author_email': 'reader@example.org',
+        'parent_id': parent
+    }).get_json()['data']['id']
+    Comment.query.get(parent).status = 'pending'
+    app.db.session.commit()
+    
+    before = client.get('/api/articles/1/comments?mode=threaded')
+    assert [node['id'] for node in before.get_json()['data']['comments']] == []
+    
+    response = client.post('/api/admin/comments/bulk-moderate', headers=admin_headers,
+                           json={'comment_ids': [parent], 'action': 'delete'})
+    assert response.status_code == 200, response.get_json()
+    
+    after = client.get('/api/articles/1/comments?mode=threaded', headers={'If-None-Match': before.headers['ETag']})
+    assert after.status_code == 200
+    assert [node['id'] for node in after.get_json()['data']['comments']] == [reply]
@@ -0,0 +1,27 @@
+import re
+import random
+import bleach
+from comment_system import CommentValidator
+
+def bleach_reference(content):
+    """What the slow path produces for content"""
+    clean = bleach.clean(content, tags=CommentValidator.ALLOWED_TAGS,
+                         attributes=CommentValidator.ALLOWED_ATTRIBUTES, strip=True)
+    return re.sub(r'\s+', ' ', clean).strip()
+
+# Every C0 control, DEL and the C1 block, Unicode whitespace and noncharacters
+SPECIAL_CHARACTERS = [chr(code) for code in range(0x00, 0xa1)] + [
+    '\u2028', '\u2029', '\u3000', '\ufdd0', '\ufeff', '\ufffe', '\uffff', '\U0001fffe'
+]
+
+def test_fast_path_matches_bleach_for_each_control_character():
+    for character in SPECIAL_CHARACTERS:
+        for content in (f"a{character}b > c", f"{character}x", f"x {character}", character * 3):
+            assert CommentValidator.sanitize_content(content) == bleach_reference(content), repr(content)
+
+def test_fast_path_matches_bleach_on_random_text():
+    rng = random.Random(45)
+    alphabet = SPECIAL_CHARACTERS + list('abc >"\'=/') + ['\t', '\r\n', ' ']
+    for _ in range(2000):
+        content = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 12)))
+        assert CommentValidator.sanitize_content(content) == bleach_reference(content), repr(content)
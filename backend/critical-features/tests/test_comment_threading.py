@@ -0,0 +1,46 @@
+from comment_system import CommentThreading
+
+def add_comment(app, **fields):
+    Comment = app.models['Comment']
+    comment = Comment(article_id=1, author_name='Reader', author_email='reader@example.org',
+                      content='A comment', status='approved', **fields)
+    app.db.session.add(comment)
+    app.db.session.flush()
+    return comment
+
+def test_reply_to_legacy_comment_without_path(app, client):
+    """Comments from before backfill-comment-paths have NULL path; replying to one must work"""
+    Article = app.models['Article']
+    app.db.session.add(Article(id=1, title='Article'))
+    root = add_comment(app)
+    legacy = add_comment(app, parent_id=root.id)
+    root.path = legacy.path = None
+    root.depth = legacy.depth = 0
+    app.db.session.commit()
+    
+    response = client.post('/api/articles/1/comments', json={
+        'content': 'Replying to an old comment',
+        'author_name': 'Another Reader',
+        'author_email': 'another@example.org',
+        'parent_id': legacy.id
+    })
+    assert response.status_code == 200, response.get_json()
+    
+    Comment = app.models['Comment']
+    reply = Comment.query.filter_by(parent_id=legacy.id).one()
+    root, legacy = Comment.query.get(root.id), Comment.query.get(legacy.id)
+    assert root.path == CommentThreading.path_segment(root.id)
+    assert legacy.path == root.path + CommentThreading.path_segment(legacy.id)
+    assert (reply.depth, reply.path) == (2, legacy.path + CommentThreading.path_segment(reply.id))
+
+def test_assign_thread_position_walks_up_legacy_ancestors(app):
+    Article = app.models['Article']
+    app.db.session.add(Article(id=1, title='Article'))
+    root = add_comment(app)
+    child = add_comment(app, parent_id=root.id)
+    grandchild = add_comment(app, parent_id=child.id)
+    root.path = child.path = None
+    
+    CommentThreading.assign_thread_position(grandchild, child)
+    assert (child.depth, grandchild.depth) == (1, 2)
+    assert grandchild.path.startswith(root.path + CommentThreading.path_segment(child.id))
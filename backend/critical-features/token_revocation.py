@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+JWT Revocation Store
+For GlobalPerspective News Platform
+
+Revoked token ids (JTIs) are kept only until the token's own expiry, in a
+store every worker can see:
+
+    sqlite:///path      one file shared by all workers on a host (default)
+    redis://host:6379/0 any Redis-protocol server, for several hosts
+
+Each worker also keeps a Bloom filter of revoked JTIs. Nearly every request
+carries a token that was never revoked, and the filter answers that case
+from memory; only a filter hit (a revoked token, or a rare false positive)
+reaches the store. The filter picks up revocations made by other workers
+every REVOCATION_SYNC_INTERVAL seconds and is rebuilt from the live
+entries every REVOCATION_REBUILD_INTERVAL so expired JTIs drop out.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+REVOCATION_URL = os.getenv('TOKEN_REVOCATION_URL', 'sqlite:///token_revocations.db')
+REVOCATION_SYNC_INTERVAL = 1.0  # Seconds before other workers' revocations apply here
+REVOCATION_REBUILD_INTERVAL = 3600  # Seconds between Bloom filter rebuilds
+REVOCATION_PURGE_INTERVAL = 300  # Seconds between deletes of expired entries
+BLOOM_CAPACITY = 100000  # Live revocations before the filter is resized
+BLOOM_ERROR_RATE = 0.01
+DEFAULT_TOKEN_TTL = 30 * 86400  # Seconds kept for tokens without an exp claim
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+    
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+    
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class SQLiteRevocationBackend:
+    """Revocations in a local SQLite file (WAL), shared by the workers on a host"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._purged_at = 0.0
+    
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS revoked_tokens (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    jti TEXT NOT NULL UNIQUE,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    def revoke(self, jti, expires_at):
+        connection = self._connection()
+        connection.execute(
+            "INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?) "
+            "ON CONFLICT (jti) DO UPDATE SET expires_at = MAX(expires_at, excluded.expires_at)",
+            (jti, expires_at)
+        )
+        now = time.time()
+        if now - self._purged_at > REVOCATION_PURGE_INTERVAL:
+            self._purged_at = now
+            connection.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+    
+    def is_revoked(self, jti):
+        return self._connection().execute(
+            "SELECT 1 FROM revoked_tokens WHERE jti = ? AND expires_at > ?", (jti, time.time())
+        ).fetchone() is not None
+    
+    def changes_since(self, cursor):
+        """JTIs revoked after cursor, and the new cursor"""
+        rows = self._connection().execute(
+            "SELECT seq, jti FROM revoked_tokens WHERE seq > ? ORDER BY seq", (cursor or 0,)
+        ).fetchall()
+        return [jti for _, jti in rows], (rows[-1][0] if rows else cursor or 0)
+    
+    def live(self):
+        """All unexpired JTIs, and a cursor for changes_since"""
+        connection = self._connection()
+        cursor = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM revoked_tokens").fetchone()[0]
+        rows = connection.execute(
+            "SELECT jti FROM revoked_tokens WHERE expires_at > ? AND seq <= ?", (time.time(), cursor)
+        ).fetchall()
+        return [jti for jti, in rows], cursor
+
+class RedisRevocationBackend:
+    """Revocations in Redis (or any server speaking its protocol)
+    
+    Each JTI is a key that expires with the token. A sorted set scored by
+    revocation time lets workers fetch recent revocations for their filter.
+    """
+    
+    def __init__(self, client, prefix='jwt:revoked:'):
+        self.client = client
+        self.prefix = prefix
+        self.log_key = prefix + 'log'
+    
+    def revoke(self, jti, expires_at):
+        now = time.time()
+        ttl = max(1, int(math.ceil(expires_at - now)))
+        pipeline = self.client.pipeline()
+        pipeline.set(self.prefix + jti, 1, ex=ttl)
+        pipeline.zadd(self.log_key, {jti: now})
+        pipeline.zremrangebyscore(self.log_key, '-inf', now - DEFAULT_TOKEN_TTL)
+        pipeline.execute()
+    
+    def is_revoked(self, jti):
+        return bool(self.client.exists(self.prefix + jti))
+    
+    def changes_since(self, cursor):
+        # Overlap a little so revocations from hosts with skewed clocks are not missed
+        since = (cursor or 0) - 5
+        now = time.time()
+        members = self.client.zrangebyscore(self.log_key, since, '+inf')
+        return [member.decode() if isinstance(member, bytes) else member for member in members], now
+    
+    def live(self):
+        # The log may hold expired JTIs; a stale filter entry only costs one extra lookup
+        return self.changes_since(time.time() - DEFAULT_TOKEN_TTL)
+
+class TokenRevocationStore:
+    """Revoke JTIs until their expiry; a per-worker Bloom filter screens lookups"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._filter = None
+        self._cursor = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self.checks = 0
+        self.filter_hits = 0  # Each one costs a store lookup
+    
+    def revoke(self, jti, expires_at=None):
+        """Revoke a token id until expires_at (epoch seconds, e.g. the JWT's exp claim)"""
+        self.backend.revoke(jti, float(expires_at or time.time() + DEFAULT_TOKEN_TTL))
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+    
+    def is_revoked(self, jti):
+        self.checks += 1
+        self._refresh()
+        if jti not in self._filter:
+            return False
+        self.filter_hits += 1
+        return self.backend.is_revoked(jti)
+    
+    def _refresh(self):
+        now = time.monotonic()
+        if self._filter is not None and now - self._synced_at < REVOCATION_SYNC_INTERVAL:
+            return
+        
+        with self._lock:
+            if self._filter is not None and now - self._synced_at < REVOCATION_SYNC_INTERVAL:
+                return
+            if self._filter is None or now - self._built_at > REVOCATION_REBUILD_INTERVAL:
+                self._rebuild()
+            else:
+                added, self._cursor = self.backend.changes_since(self._cursor)
+                for jti in added:
+                    self._filter.add(jti)
+                if self._filter.count > self._filter.capacity:
+                    self._rebuild()
+            self._synced_at = now
+    
+    def _rebuild(self):
+        # Caller holds self._lock
+        jtis, cursor = self.backend.live()
+        bloom = BloomFilter(max(BLOOM_CAPACITY, 2 * len(jtis)))
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter, self._cursor = bloom, cursor
+        self._built_at = time.monotonic()
+    
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'checks': self.checks,
+            'filter_hits': self.filter_hits,
+            'filter_entries': self._filter.count if self._filter else 0
+        }
+
+def create_revocation_store(url=REVOCATION_URL):
+    """Store for a sqlite:///path or redis:// URL"""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise RuntimeError("TOKEN_REVOCATION_URL is a Redis URL but the redis package is not installed")
+        return TokenRevocationStore(RedisRevocationBackend(redis.Redis.from_url(url)))
+    if url.startswith('sqlite:///'):
+        return TokenRevocationStore(SQLiteRevocationBackend(url[len('sqlite:///'):]))
+    raise ValueError(f"Unsupported TOKEN_REVOCATION_URL: {url}")
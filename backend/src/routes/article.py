@@ -1,11 +1,15 @@
 from datetime import datetime
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import defer
 from src.models.user import db
 from src.models.article import Article, Category, MediaItem
 import re
 
 article_bp = Blueprint('article', __name__)
 
+# Maximum ids + slugs accepted by /articles/batch
+MAX_BATCH_ARTICLES = 50
+
 def create_slug(title):
     """Create URL-friendly slug from title"""
     slug = re.sub(r'[^\w\s-]', '', title.lower())
@@ -50,6 +54,53 @@ def get_articles():
         'has_prev': articles.has_prev
     })
 
+@article_bp.route('/articles/batch', methods=['GET'])
+def get_articles_batch():
+    """Get several articles by id and/or slug in one request"""
+    raw_ids = [value.strip() for value in request.args.get('ids', '').split(',') if value.strip()]
+    slugs = [value.strip() for value in request.args.get('slugs', '').split(',') if value.strip()]
+    view = request.args.get('view', 'summary')  # summary, full
+    
+    invalid_ids = [value for value in raw_ids if not value.isdigit()]
+    if invalid_ids:
+        return jsonify({'error': f"ids must be integers: {', '.join(invalid_ids)}"}), 400
+    ids = [int(value) for value in raw_ids]
+    
+    if not ids and not slugs:
+        return jsonify({'error': 'ids or slugs are required'}), 400
+    
+    if len(ids) + len(slugs) > MAX_BATCH_ARTICLES:
+        return jsonify({'error': f'At most {MAX_BATCH_ARTICLES} articles per request'}), 400
+    
+    if view not in ('summary', 'full'):
+        return jsonify({'error': 'view must be summary or full'}), 400
+    
+    query = Article.query
+    if view == 'summary':
+        query = query.options(defer(Article.content))  # Summaries never show the body
+    articles = query.filter(
+        (Article.id.in_(ids)) | (Article.slug.in_(slugs))
+    ).all()
+    
+    by_id = {article.id: article for article in articles}
+    by_slug = {article.slug: article for article in articles}
+    
+    # Preserve the requested order: ids first, then slugs
+    ordered = []
+    seen = set()
+    for article in [by_id.get(i) for i in ids] + [by_slug.get(s) for s in slugs]:
+        if article is not None and article.id not in seen:
+            seen.add(article.id)
+            ordered.append(article)
+    
+    return jsonify({
+        'articles': [article.to_dict(include_content=(view == 'full')) for article in ordered],
+        'missing': {
+            'ids': [i for i in ids if i not in by_id],
+            'slugs': [s for s in slugs if s not in by_slug]
+        }
+    })
+
 @article_bp.route('/articles/<int:article_id>', methods=['GET'])
 def get_article(article_id):
     """Get single article by ID"""
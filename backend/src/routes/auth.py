@@ -1,6 +1,10 @@
 from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
+from collections import OrderedDict
+import threading
+import hashlib
+import time
 import jwt
 import os
 
@@ -10,6 +14,12 @@ auth_bp = Blueprint('auth', __name__)
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_EXPIRATION_HOURS = 24
 
+# Verified tokens: sha256(token) -> (exp, user_id), valid until exp
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_cache_secret = JWT_SECRET
+
 def generate_token(user_id):
     """Generate JWT token for user"""
     payload = {
@@ -20,14 +30,62 @@ def generate_token(user_id):
     return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
 
 def verify_token(token):
-    """Verify JWT token and return user_id"""
+    """Verify JWT token and return user_id
+    
+    Tokens that verified once are remembered until their exp, so repeat
+    calls (the SPA calls /auth/me on every navigation) skip the HMAC check
+    and decode.
+    """
+    global _token_cache_secret
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
+    
+    with _token_cache_lock:
+        secret = JWT_SECRET
+        if _token_cache_secret != secret:
+            # Secret rotated: nothing verified under the old one is trusted
+            _token_cache.clear()
+            _token_cache_secret = secret
+        cached = _token_cache.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                _token_cache.move_to_end(key)
+                return cached[1]
+            del _token_cache[key]
+    
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return payload['user_id']
+        payload = jwt.decode(token, secret, algorithms=['HS256'])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    with _token_cache_lock:
+        # Rotated during the decode: the token was signed with the retired secret
+        if _token_cache_secret != secret or JWT_SECRET != secret:
+            return None
+        if 'exp' in payload:
+            _token_cache[key] = (payload['exp'], payload['user_id'])
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return payload['user_id']
+
+def forget_token(token):
+    """Drop a token from the verified-token cache; call when revoking it"""
+    with _token_cache_lock:
+        _token_cache.pop(hashlib.sha256(token.encode('utf-8')).digest(), None)
+
+def clear_token_cache():
+    """Forget every verified token, e.g. after revoking a user's sessions"""
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def rotate_jwt_secret(secret):
+    """Switch the signing secret; tokens signed with the old one stop verifying"""
+    global JWT_SECRET
+    with _token_cache_lock:
+        JWT_SECRET = secret
+        _token_cache.clear()
 
 @auth_bp.route('/auth/register', methods=['POST'])
 def register():
@@ -119,6 +177,9 @@ def login():
 @auth_bp.route('/auth/logout', methods=['POST'])
 def logout():
     """Logout user (client-side token removal)"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        forget_token(auth_header.split(' ')[1])
     return jsonify({'message': 'Logout successful'})
 
 @auth_bp.route('/auth/me', methods=['GET'])
@@ -41,6 +41,7 @@ def create_tables(conn):
             bio TEXT,
             avatar_url VARCHAR(255),
             is_active BOOLEAN DEFAULT TRUE,
+            article_count INTEGER DEFAULT 0 NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             last_login TIMESTAMP
         );
@@ -55,6 +56,7 @@ def create_tables(conn):
             description TEXT,
             color VARCHAR(7) DEFAULT '#dc2626',
             is_active BOOLEAN DEFAULT TRUE,
+            article_count INTEGER DEFAULT 0 NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
@@ -129,7 +131,7 @@ def create_tables(conn):
             id SERIAL PRIMARY KEY,
             article_id INTEGER REFERENCES articles(id) ON DELETE CASCADE,
             title VARCHAR(255) NOT NULL,
-            content TEXT NOT NULL,
+            content BYTEA NOT NULL,
             excerpt TEXT,
             revision_number INTEGER DEFAULT 1,
             created_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
@@ -262,9 +264,63 @@ def create_tables(conn):
         );
     """)
     
+    # Deleted article ids for the delta sync feed
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS article_tombstones (
+            id SERIAL PRIMARY KEY,
+            article_id INTEGER NOT NULL,
+            deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
     print("✅ All tables created successfully!")
     cursor.close()
 
+def apply_schema_updates(conn):
+    """Add columns introduced after the initial schema to existing tables"""
+    cursor = conn.cursor()
+    
+    # Published-article counters maintained by the application
+    cursor.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS article_count INTEGER DEFAULT 0 NOT NULL;")
+    cursor.execute("ALTER TABLE categories ADD COLUMN IF NOT EXISTS article_count INTEGER DEFAULT 0 NOT NULL;")
+    cursor.execute("""
+        UPDATE categories c SET article_count = counts.total
+        FROM (SELECT category_id, COUNT(*) AS total FROM articles
+              WHERE status = 'published' GROUP BY category_id) counts
+        WHERE c.id = counts.category_id AND c.article_count <> counts.total;
+    """)
+    cursor.execute("""
+        UPDATE users u SET article_count = counts.total
+        FROM (SELECT author_id, COUNT(*) AS total FROM articles
+              WHERE status = 'published' GROUP BY author_id) counts
+        WHERE u.id = counts.author_id AND u.article_count <> counts.total;
+    """)
+    
+    # Revision bodies are stored compressed (admin-system/compressed_text.py).
+    # Only the admin system reads article_revisions; articles.content stays
+    # TEXT because the public backends search and serve it directly.
+    # Existing TEXT bodies become their UTF-8 bytes, which the column type
+    # still reads; compress_content.py then compresses them in batches.
+    cursor.execute("""
+        SELECT table_name, data_type FROM information_schema.columns
+        WHERE table_name IN ('articles', 'article_revisions') AND column_name = 'content';
+    """)
+    content_types = dict(cursor.fetchall())
+    if content_types.get('article_revisions') == 'text':
+        cursor.execute("ALTER TABLE article_revisions ALTER COLUMN content TYPE BYTEA USING convert_to(content, 'UTF8');")
+    
+    # Databases set up while articles.content was compressed too get it back as TEXT
+    if content_types.get('articles') == 'bytea':
+        cursor.execute("SELECT COUNT(*) FROM articles WHERE substring(content from 1 for 3) = '\\x1f4750'::bytea;")
+        compressed = cursor.fetchone()[0]
+        if compressed:
+            print(f"⚠️ {compressed} compressed article bodies; run admin-system/compress_content.py restore-articles, then rerun this setup")
+        else:
+            cursor.execute("ALTER TABLE articles ALTER COLUMN content TYPE TEXT USING convert_from(content, 'UTF8');")
+    
+    print("✅ Schema updates applied successfully!")
+    cursor.close()
+
 def create_indexes(conn):
     """Create database indexes for performance"""
     cursor = conn.cursor()
@@ -275,11 +331,16 @@ def create_indexes(conn):
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_author_id ON articles(author_id);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_category_id ON articles(category_id);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_slug ON articles(slug);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_updated_at_id ON articles(updated_at, id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_article_tombstones_deleted_at_article_id ON article_tombstones(deleted_at, article_id);")
     
     # Comments indexes
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_article_id ON comments(article_id);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_status ON comments(status);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_created_at ON comments(created_at);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_article_id_status ON comments(article_id, status);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_ip_created_at ON comments(ip_address, created_at, id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_author_email_lower ON comments(lower(author_email));")
     
     # Users indexes
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);")
@@ -399,47 +460,41 @@ def create_database_functions(conn):
         $$ language 'plpgsql';
     """)
     
-    # Trigger to automatically update updated_at
+    # Articles skip view-count-only updates so page views do not show up
+    # in the delta sync feed, which is keyed on updated_at
     cursor.execute("""
-        DROP TRIGGER IF EXISTS update_articles_updated_at ON articles;
-        CREATE TRIGGER update_articles_updated_at
-            BEFORE UPDATE ON articles
-            FOR EACH ROW
-            EXECUTE FUNCTION update_updated_at_column();
-    """)
-    
-    # Function to update comment count
-    cursor.execute("""
-        CREATE OR REPLACE FUNCTION update_article_comment_count()
+        CREATE OR REPLACE FUNCTION update_article_updated_at()
         RETURNS TRIGGER AS $$
+        DECLARE
+            unchanged articles%ROWTYPE;
         BEGIN
-            IF TG_OP = 'INSERT' THEN
-                UPDATE articles SET comment_count = comment_count + 1 WHERE id = NEW.article_id;
-                RETURN NEW;
-            ELSIF TG_OP = 'DELETE' THEN
-                UPDATE articles SET comment_count = comment_count - 1 WHERE id = OLD.article_id;
-                RETURN OLD;
+            unchanged := NEW;
+            unchanged.view_count := OLD.view_count;
+            unchanged.updated_at := OLD.updated_at;
+            IF ROW(unchanged.*) IS DISTINCT FROM ROW(OLD.*) THEN
+                NEW.updated_at = CURRENT_TIMESTAMP;
             END IF;
-            RETURN NULL;
+            RETURN NEW;
         END;
         $$ language 'plpgsql';
     """)
     
-    # Triggers for comment count
+    # Trigger to automatically update updated_at
     cursor.execute("""
-        DROP TRIGGER IF EXISTS update_comment_count_insert ON comments;
-        CREATE TRIGGER update_comment_count_insert
-            AFTER INSERT ON comments
+        DROP TRIGGER IF EXISTS update_articles_updated_at ON articles;
+        CREATE TRIGGER update_articles_updated_at
+            BEFORE UPDATE ON articles
             FOR EACH ROW
-            EXECUTE FUNCTION update_article_comment_count();
+            EXECUTE FUNCTION update_article_updated_at();
     """)
     
+    # articles.comment_count counts approved comments only and is maintained by the
+    # application (plus `flask reconcile-counts`). The old triggers counted every
+    # status on top of that, so remove them from existing databases.
     cursor.execute("""
+        DROP TRIGGER IF EXISTS update_comment_count_insert ON comments;
         DROP TRIGGER IF EXISTS update_comment_count_delete ON comments;
-        CREATE TRIGGER update_comment_count_delete
-            AFTER DELETE ON comments
-            FOR EACH ROW
-            EXECUTE FUNCTION update_article_comment_count();
+        DROP FUNCTION IF EXISTS update_article_comment_count();
     """)
     
     print("✅ Database functions and triggers created successfully!")
@@ -460,6 +515,9 @@ def setup_database():
         print("\n📋 Creating tables...")
         create_tables(conn)
         
+        print("\n🔄 Applying schema updates...")
+        apply_schema_updates(conn)
+        
         print("\n⚡ Creating indexes...")
         create_indexes(conn)
         